@@ -1,315 +1,531 @@
-# Import necessary libraries
-from flask import Flask, request
-from twilio.twiml.messaging_response import MessagingResponse
-from twilio.rest import Client
-import threading
-import time
-from datetime import datetime, timedelta
-import os
-import re
-from apscheduler.schedulers.background import BackgroundScheduler
-
-app = Flask(__name__)
-
-reminders = []
-user_states = {}
-
-# Define conversation states
-STATE_INITIAL = 'initial'
-STATE_AWAITING_DATE = 'awaiting_date'
-STATE_AWAITING_TIME = 'awaiting_time'
-STATE_AWAITING_MESSAGE = 'awaiting_message'
-
-
-# Load environment variables
-from dotenv import load_dotenv
-load_dotenv()
-
-# Twilio credentials - try to get from environment variables, fall back to hardcoded values
-TWILIO_ACCOUNT_SID = os.environ.get("TWILIO_ACCOUNT_SID")
-TWILIO_AUTH_TOKEN = os.environ.get("TWILIO_AUTH_TOKEN")
-TWILIO_WHATSAPP_NUMBER = os.environ.get("TWILIO_WHATSAPP_NUMBER")
-
-client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-
-def send_reminder(reminder):
-    try:
-        client.messages.create(
-            body=f"⏰ Reminder: {reminder['msg']}",
-            from_=TWILIO_WHATSAPP_NUMBER,
-            to=reminder["to"]
-        )
-        print(f"Sent reminder to {reminder['to']}: {reminder['msg']}")
-    except Exception as e:
-        print("Failed to send reminder:", e)
-
-def schedule_consecutive_reminders(to_number, message, target_date, time_str):
-    # Parse the target date and time
-    target_datetime = datetime.strptime(f"{target_date} {time_str}", "%Y-%m-%d %H:%M")
-    
-    # Calculate days until the target date
-    days_until_target = (target_datetime.date() - datetime.now().date()).days
-    
-    if days_until_target <= 0:
-        # If the target date is today or in the past, just schedule one reminder
-        scheduler.add_job(
-            send_reminder,
-            'date',
-            run_date=target_datetime,
-            args=[{"to": to_number, "msg": message}]
-        )
-        return [target_datetime.strftime("%Y-%m-%d %H:%M")]
-    
-    # Schedule reminders for consecutive days
-    reminder_dates = []
-    
-    # First reminder: 4 days before or halfway to the event if less than 4 days away
-    days_before_first = min(4, days_until_target // 2) if days_until_target > 1 else 0
-    if days_before_first > 0:
-        first_reminder = target_datetime - timedelta(days=days_before_first)
-        scheduler.add_job(
-            send_reminder,
-            'date',
-            run_date=first_reminder,
-            args=[{"to": to_number, "msg": f"Upcoming in {days_before_first} days: {message}"}]
-        )
-        reminder_dates.append(first_reminder.strftime("%Y-%m-%d %H:%M"))
-    
-    # Second reminder: 2 days before if more than 2 days away
-    if days_until_target > 2:
-        second_reminder = target_datetime - timedelta(days=2)
-        scheduler.add_job(
-            send_reminder,
-            'date',
-            run_date=second_reminder,
-            args=[{"to": to_number, "msg": f"Coming up in 2 days: {message}"}]
-        )
-        reminder_dates.append(second_reminder.strftime("%Y-%m-%d %H:%M"))
-    
-    # Final reminder: On the day of the event
-    scheduler.add_job(
-        send_reminder,
-        'date',
-        run_date=target_datetime,
-        args=[{"to": to_number, "msg": f"Today: {message}"}]
-    )
-    reminder_dates.append(target_datetime.strftime("%Y-%m-%d %H:%M"))
-    
-    return reminder_dates
-
-# Initialize the scheduler with error handling
-try:
-    scheduler = BackgroundScheduler()
-    scheduler.start()
-    print("Scheduler started successfully")
-except Exception as e:
-    print(f"Error starting scheduler: {e}")
-
-def parse_date(date_str):
-    """Parse date from various formats"""
-    date_patterns = [
-        # DD/MM/YYYY or DD-MM-YYYY
-        r'(\d{1,2})[/-](\d{1,2})[/-](\d{4})',
-        # DD/MM or DD-MM (current year)
-        r'(\d{1,2})[/-](\d{1,2})',
-        # Month name formats
-        r'(\d{1,2})\s+([A-Za-z]+)\s+(\d{4})',  # 26 Aug 2025
-        r'(\d{1,2})\s+([A-Za-z]+)',             # 26 Aug
-        r'([A-Za-z]+)\s+(\d{1,2})\s+(\d{4})',  # Aug 26 2025
-        r'([A-Za-z]+)\s+(\d{1,2})'              # Aug 26
-    ]
-    
-    for pattern in date_patterns:
-        match = re.search(pattern, date_str)
-        if match:
-            groups = match.groups()
-            current_year = datetime.now().year
-            
-            # Handle different patterns
-            if len(groups) == 3 and groups[2].isdigit() and len(groups[2]) == 4:  # Full date with year
-                if groups[1].isdigit():  # DD/MM/YYYY
-                    day, month, year = int(groups[0]), int(groups[1]), int(groups[2])
-                else:  # DD Month YYYY or Month DD YYYY
-                    if groups[0].isdigit():
-                        day, month_name, year = int(groups[0]), groups[1], int(groups[2])
-                        month = get_month_number(month_name)
-                    else:
-                        month_name, day, year = groups[0], int(groups[1]), int(groups[2])
-                        month = get_month_number(month_name)
-            elif len(groups) == 2:  # Date without year
-                if groups[1].isdigit():  # DD/MM
-                    day, month, year = int(groups[0]), int(groups[1]), current_year
-                else:  # DD Month or Month DD
-                    if groups[0].isdigit():
-                        day, month_name = int(groups[0]), groups[1]
-                        month = get_month_number(month_name)
-                    else:
-                        month_name, day = groups[0], int(groups[1])
-                        month = get_month_number(month_name)
-                    year = current_year
-            
-            # Validate date
-            try:
-                date_obj = datetime(year, month, day)
-                return date_obj.strftime("%Y-%m-%d")
-            except ValueError:
-                continue
-    
-    return None
-
-def get_month_number(month_name):
-    """Convert month name to month number"""
-    month_name = month_name.lower()
-    months = {
-        'jan': 1, 'january': 1,
-        'feb': 2, 'february': 2,
-        'mar': 3, 'march': 3,
-        'apr': 4, 'april': 4,
-        'may': 5,
-        'jun': 6, 'june': 6,
-        'jul': 7, 'july': 7,
-        'aug': 8, 'august': 8,
-        'sep': 9, 'september': 9,
-        'oct': 10, 'october': 10,
-        'nov': 11, 'november': 11,
-        'dec': 12, 'december': 12
-    }
-    
-    for key, value in months.items():
-        if month_name.startswith(key):
-            return value
-    
-    return None
-
-@app.route("/", methods=["POST"])
-def bot():
-    user_msg = request.values.get("Body", "").strip()
-    from_number = request.values.get("From", "")
-    response = MessagingResponse()
-
-    # Initialize user state if not exists
-    if from_number not in user_states:
-        user_states[from_number] = {
-            'state': STATE_INITIAL,
-            'reminder_data': {}
-        }
-    
-    user_state = user_states[from_number]
-    
-    # Handle commands
-    if user_msg.lower() == "cancel":
-        user_states[from_number] = {
-            'state': STATE_INITIAL,
-            'reminder_data': {}
-        }
-        response.message("Reminder setup canceled. Send 'remind' to start a new reminder.")
-        return str(response)
-    
-    # Always start with date when setting a reminder
-    if user_msg.lower() == "remind" or user_msg.lower() == "set reminder" or user_msg.lower() == "set a reminder":
-        user_state['state'] = STATE_AWAITING_DATE
-        user_state['reminder_data'] = {}
-        response.message("📅 What date do you want to be reminded on? (e.g., 26 Aug 2025, 26/08/2025)")
-        return str(response)
-    
-    # Handle conversation states
-    if user_state['state'] == STATE_AWAITING_DATE:
-        parsed_date = parse_date(user_msg)
-        if parsed_date:
-            user_state['reminder_data']['date'] = parsed_date
-            user_state['state'] = STATE_AWAITING_TIME
-            response.message("⏰ What time would you like to be reminded? (e.g., 14:30 or 2:30)")
-        else:
-            response.message("I couldn't understand that date format. Please try again with a format like:\n- 26 Aug 2025\n- 26/08/2025\n- August 26\n\nType 'cancel' to start over.")
-    
-    elif user_state['state'] == STATE_AWAITING_TIME:
-        # Try to parse time (HH:MM)
-        time_match = re.match(r'^(\d{1,2})[:h](\d{2})$', user_msg)
-        if time_match:
-            hour, minute = map(int, time_match.groups())
-            if 0 <= hour <= 23 and 0 <= minute <= 59:
-                time_str = f"{hour:02d}:{minute:02d}"
-                user_state['reminder_data']['time'] = time_str
-                user_state['state'] = STATE_AWAITING_MESSAGE
-                
-                # Format the date for display
-                date_obj = datetime.strptime(user_state['reminder_data']['date'], "%Y-%m-%d")
-                formatted_date = date_obj.strftime("%d %b %Y")
-                
-                response.message(f"📝 Finally, what would you like to be reminded about on {formatted_date} at {time_str}?")
-            else:
-                response.message("Invalid time. Please enter a valid time in 24-hour format (e.g., 14:30) or 12-hour format (e.g., 2:30).\n\nType 'cancel' to start over.")
-        else:
-            response.message("I couldn't understand that time format. Please use HH:MM format (e.g., 14:30 or 2:30).\n\nType 'cancel' to start over.")
-    
-    elif user_state['state'] == STATE_AWAITING_MESSAGE:
-        # Save the reminder message and schedule reminders
-        reminder_data = user_state['reminder_data']
-        reminder_data['msg'] = user_msg
-        
-        # Schedule consecutive reminders
-        reminder_dates = schedule_consecutive_reminders(
-            from_number,
-            reminder_data['msg'],
-            reminder_data['date'],
-            reminder_data['time']
-        )
-        
-        # Format response message
-        target_date = datetime.strptime(f"{reminder_data['date']} {reminder_data['time']}", "%Y-%m-%d %H:%M")
-        days_until = (target_date.date() - datetime.now().date()).days
-        
-        if days_until <= 0:
-            msg = f"✅ Reminder set for today at {reminder_data['time']}:\n"
-        else:
-            msg = f"✅ Reminder set for {target_date.strftime('%d %b %Y')} at {reminder_data['time']}:\n"
-        
-        msg += f"📝 {reminder_data['msg']}\n\n"
-        
-        if len(reminder_dates) > 1:
-            msg += "You'll be reminded on:\n"
-            for date_str in reminder_dates:
-                reminder_date = datetime.strptime(date_str, "%Y-%m-%d %H:%M")
-                msg += f"- {reminder_date.strftime('%d %b')} at {reminder_date.strftime('%H:%M')}\n"
-        
-        response.message(msg)
-        
-        # Reset state
-        user_state['state'] = STATE_INITIAL
-        user_state['reminder_data'] = {}
-    
-    else:  # STATE_INITIAL
-        if user_msg.lower().startswith("remind me at"):
-            # Support for legacy format
-            try:
-                # Parse: "remind me at HH:MM message"
-                parts = user_msg.split(" ", 4)
-                time_part = parts[3]
-                msg_part = parts[4] if len(parts) > 4 else ""
-                remind_time = datetime.strptime(time_part, "%H:%M").replace(
-                    year=datetime.now().year,
-                    month=datetime.now().month,
-                    day=datetime.now().day
-                )
-                # If time already passed today, schedule for tomorrow
-                if remind_time < datetime.now():
-                    remind_time = remind_time.replace(day=remind_time.day + 1)
-                
-                # Schedule a single reminder
-                scheduler.add_job(
-                    send_reminder,
-                    'date',
-                    run_date=remind_time,
-                    args=[{"to": from_number, "msg": msg_part}]
-                )
-                
-                response.message(f"Okay, I'll remind you at {remind_time.strftime('%H:%M')} {msg_part} ✅")
-            except Exception as e:
-                response.message("Invalid format. Use: remind me at HH:MM Your message")
-        else:
-            response.message("Welcome to RemindMe! 📅\n\nTo set a reminder with consecutive notifications, send:\n'remind' or 'set reminder'\n\nI'll guide you through setting the date, time, and message for your reminder.\n\nOr use the quick format for simple reminders:\nremind me at HH:MM Your message")
-
-    return str(response)
-
-if __name__ == "__main__":
-    app.run()
+# Import necessary libraries
+from flask import Flask, Response, request
+import threading
+import time
+import re
+import metrics
+from datetime import datetime, timedelta
+import os
+import database
+import date_parser
+import recurrence
+import delivery
+import dispatcher
+import timing_wheel
+import idempotency
+import nlu
+import twiml
+import session_store
+import write_queue
+
+app = Flask(__name__)
+
+reminders = []
+
+# Define conversation states
+STATE_INITIAL = 'initial'
+STATE_AWAITING_DATE = 'awaiting_date'
+STATE_AWAITING_TIME = 'awaiting_time'
+STATE_AWAITING_MESSAGE = 'awaiting_message'
+
+# Commands for reminders that are already scheduled
+LIST_COMMANDS = ("list reminders", "list")
+LIST_PAGE_SIZE = 10
+CANCEL_ID_PATTERN = re.compile(r"cancel\s+#?(\d+)")
+SNOOZE_PATTERN = re.compile(r"snooze\s+#?(\d+)(?:\s+(\d+))?")
+DEFAULT_SNOOZE_MINUTES = 10
+MAX_SNOOZE_MINUTES = 365 * 24 * 60
+# Largest id SQLite can store, so anything bigger can't be one of the sender's reminders
+MAX_REMINDER_ID = 2 ** 63 - 1
+# "every monday at 09:00 standup", "every mon-fri at 7 am walk", "daily at 08:30 vitamins until 31 Dec 2025"
+RECURRING_PATTERN = re.compile(
+    r"(?:remind me\s+)?(?:every\s+(?P<every>.+?)|(?P<daily>daily))\s+at\s+(?P<time>\S+?(?:\s*[ap]\.?m\b\.?)?)\s+(?P<msg>.+)",
+    re.IGNORECASE | re.DOTALL
+)
+
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+# Twilio credentials - try to get from environment variables, fall back to hardcoded values
+TWILIO_ACCOUNT_SID = os.environ.get("TWILIO_ACCOUNT_SID")
+TWILIO_AUTH_TOKEN = os.environ.get("TWILIO_AUTH_TOKEN")
+TWILIO_WHATSAPP_NUMBER = os.environ.get("TWILIO_WHATSAPP_NUMBER")
+
+# Reminder dispatch settings
+# 'sqlite' keeps reminders in the database across restarts, 'memory' holds them in an in-process timing wheel
+REMINDER_BACKEND = os.environ.get("REMINDER_BACKEND", "sqlite")
+DISPATCH_POLL_INTERVAL = float(os.environ.get("DISPATCH_POLL_INTERVAL", dispatcher.POLL_INTERVAL))
+DISPATCH_BATCH_SIZE = int(os.environ.get("DISPATCH_BATCH_SIZE", dispatcher.BATCH_SIZE))
+DISPATCH_LEASE_SECONDS = int(os.environ.get("DISPATCH_LEASE_SECONDS", dispatcher.LEASE_SECONDS))
+# Optional "index/count" hash sharding of users across nodes, e.g. DISPATCH_SHARD=0/3
+DISPATCH_SHARD, DISPATCH_SHARD_COUNT = map(int, os.environ.get("DISPATCH_SHARD", "0/1").split("/"))
+
+# Acknowledge webhooks before their reminders are committed; a background writer group-commits them
+ASYNC_WRITES = os.environ.get("ASYNC_WRITES", "0").lower() in ("1", "true", "yes")
+GROUP_COMMIT_INTERVAL_SECONDS = float(os.environ.get("GROUP_COMMIT_INTERVAL_SECONDS", "0.05"))
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get("GROUP_COMMIT_MAX_BATCH", "1000"))
+# Longest a list/cancel/snooze webhook waits for the sender's queued reminders to be committed
+GROUP_COMMIT_FLUSH_TIMEOUT_SECONDS = float(os.environ.get("GROUP_COMMIT_FLUSH_TIMEOUT_SECONDS", "2"))
+
+# Free-text reminders: 'local' parser only, 'gemini' falls back to google-genai, 'stub' to an offline table, 'off'
+NLU_BACKEND = os.environ.get("NLU_BACKEND", "local")
+NLU_CACHE_SIZE = int(os.environ.get("NLU_CACHE_SIZE", "10000"))
+NLU_BATCH_WINDOW_SECONDS = float(os.environ.get("NLU_BATCH_WINDOW_SECONDS", "0.02"))
+NLU_MAX_BATCH = int(os.environ.get("NLU_MAX_BATCH", "16"))
+
+understander = nlu.create_understander(
+    NLU_BACKEND,
+    NLU_CACHE_SIZE,
+    NLU_BATCH_WINDOW_SECONDS,
+    NLU_MAX_BATCH,
+    api_key=os.environ.get("GEMINI_API_KEY"),
+    model=os.environ.get("GEMINI_MODEL"),
+    stub_file=os.environ.get("NLU_STUB_FILE")
+)
+
+# Conversation state settings
+# 'memory' is fastest but per-process, 'sqlite' shares sessions between gunicorn workers
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "memory")
+SESSION_TTL = int(os.environ.get("SESSION_TTL", "3600"))
+SESSION_MAX_ENTRIES = int(os.environ.get("SESSION_MAX_ENTRIES", "100000"))
+
+sessions = session_store.create_session_store(SESSION_BACKEND, SESSION_TTL, SESSION_MAX_ENTRIES)
+
+# Webhook deduplication: 'memory' covers one process, 'sqlite' is shared between gunicorn workers
+WEBHOOK_DEDUPE_BACKEND = os.environ.get("WEBHOOK_DEDUPE_BACKEND", "memory")
+WEBHOOK_DEDUPE_TTL = int(os.environ.get("WEBHOOK_DEDUPE_TTL", "3600"))
+
+webhook_dedupe = idempotency.create_dedupe(WEBHOOK_DEDUPE_BACKEND, WEBHOOK_DEDUPE_TTL)
+
+# Outbound delivery settings
+TWILIO_API_BASE = os.environ.get("TWILIO_API_BASE", delivery.TWILIO_API_BASE)
+DELIVERY_WORKERS = int(os.environ.get("DELIVERY_WORKERS", "8"))
+DELIVERY_QUEUE_SIZE = int(os.environ.get("DELIVERY_QUEUE_SIZE", "10000"))
+DELIVERY_MAX_RETRIES = int(os.environ.get("DELIVERY_MAX_RETRIES", "4"))
+# Messages per second allowed for the sender number
+TWILIO_SEND_RATE = float(os.environ.get("TWILIO_SEND_RATE", "80"))
+# Reminders for one recipient within this many seconds are sent as one digest (0 disables)
+COALESCE_WINDOW_SECONDS = float(os.environ.get("COALESCE_WINDOW_SECONDS", "0"))
+COALESCE_MAX_LENGTH = int(os.environ.get("COALESCE_MAX_LENGTH", delivery.MAX_BODY_LENGTH))
+# Reminders held for digests at once; the dispatcher stops claiming more until some are sent
+COALESCE_MAX_PENDING = int(os.environ.get("COALESCE_MAX_PENDING", "1000"))
+
+sender = delivery.TwilioSender(
+    TWILIO_ACCOUNT_SID,
+    TWILIO_AUTH_TOKEN,
+    TWILIO_WHATSAPP_NUMBER,
+    base_url=TWILIO_API_BASE,
+    pool_size=DELIVERY_WORKERS
+)
+pipeline = delivery.DeliveryPipeline(
+    sender,
+    workers=DELIVERY_WORKERS,
+    queue_size=DELIVERY_QUEUE_SIZE,
+    rate=TWILIO_SEND_RATE,
+    max_retries=DELIVERY_MAX_RETRIES,
+    on_result=lambda reminder, outcome: reminder_dispatcher.delivered(reminder, outcome)
+).start()
+
+coalescer = None
+if COALESCE_WINDOW_SECONDS > 0:
+    coalescer = delivery.Coalescer(pipeline.submit, COALESCE_WINDOW_SECONDS, COALESCE_MAX_LENGTH,
+                                   COALESCE_MAX_PENDING).start()
+
+def send_reminder(reminder):
+    # Hand the reminder on; both the coalescer and the pipeline block while full, which holds back claiming
+    if coalescer:
+        coalescer.submit(reminder)
+    else:
+        pipeline.submit(reminder)
+
+def send_reminder_batch(entries):
+    now = datetime.now()
+    for entry in entries:
+        due = timing_wheel.datetime_of(entry.due)
+        send_reminder({"to": entry.to, "msg": entry.msg, "due": due})
+        if entry.rule:
+            # Only the next occurrence of a recurring reminder is ever in the wheel
+            next_time = entry.rule.next_occurrence(due, now)
+            if next_time:
+                wheel.schedule(next_time, entry.to, entry.msg, entry.rule)
+
+# Every gunicorn worker runs its own dispatcher; leases in the shared database keep them from double-sending
+reminder_dispatcher = dispatcher.Dispatcher(
+    send_reminder,
+    interval=DISPATCH_POLL_INTERVAL,
+    batch_size=DISPATCH_BATCH_SIZE,
+    lease_seconds=DISPATCH_LEASE_SECONDS,
+    shard=DISPATCH_SHARD,
+    shard_count=DISPATCH_SHARD_COUNT
+)
+
+# Group-commit writer, started along with the dispatcher when ASYNC_WRITES is set
+writes = None
+
+def store_reminders(to_number, reminders):
+    """Hand (message, run_date) pairs for one user to the configured reminder backend"""
+    if REMINDER_BACKEND == "memory":
+        for message, run_date in reminders:
+            wheel.schedule(run_date, to_number, message)
+    elif writes and writes.is_alive():
+        writes.submit(database.insert_reminders, to_number, reminders)
+    else:
+        database.add_reminders(to_number, reminders)
+
+def store_recurring_reminder(to_number, message, rule):
+    """Store a repeating reminder and return its first occurrence, or None if the rule has already ended"""
+    first_time = rule.first_after(datetime.now())
+    if first_time is None:
+        return None
+    if REMINDER_BACKEND == "memory":
+        wheel.schedule(first_time, to_number, message, rule)
+    elif writes and writes.is_alive():
+        writes.submit(database.insert_recurring_reminder, to_number, message, rule, first_time)
+    else:
+        database.add_recurring_reminder(to_number, message, rule, first_time)
+    return first_time
+
+def schedule_consecutive_reminders(to_number, message, target_date, time_str):
+    # Parse the target date and time
+    target_datetime = datetime.fromisoformat(f"{target_date} {time_str}")
+    
+    # Calculate days until the target date
+    days_until_target = (target_datetime.date() - datetime.now().date()).days
+    
+    if days_until_target <= 0:
+        # If the target date is today or in the past, just schedule one reminder
+        store_reminders(to_number, [(message, target_datetime)])
+        return [target_datetime]
+    
+    # Schedule reminders for consecutive days
+    reminders = []
+    
+    # First reminder: 4 days before or halfway to the event if less than 4 days away
+    days_before_first = min(4, days_until_target // 2) if days_until_target > 1 else 0
+    if days_before_first > 0:
+        first_reminder = target_datetime - timedelta(days=days_before_first)
+        reminders.append((f"Upcoming in {days_before_first} days: {message}", first_reminder))
+    
+    # Second reminder: 2 days before if more than 2 days away
+    if days_until_target > 2:
+        second_reminder = target_datetime - timedelta(days=2)
+        reminders.append((f"Coming up in 2 days: {message}", second_reminder))
+    
+    # Final reminder: On the day of the event
+    reminders.append((f"Today: {message}", target_datetime))
+    
+    # Store all of them in one go
+    store_reminders(to_number, reminders)
+    
+    return [run_date for _, run_date in reminders]
+
+# Create the reminder tables first; a worker that can't should fail to start, not run without its dispatcher
+if REMINDER_BACKEND != "memory":
+    database.create_database()
+
+# Start firing reminders from the configured backend
+try:
+    if REMINDER_BACKEND == "memory":
+        wheel = timing_wheel.TimingWheel()
+        timing_wheel.start_wheel(wheel, send_reminder_batch)
+    else:
+        # Start polling the reminder tables for due reminders
+        if ASYNC_WRITES:
+            writes = write_queue.GroupCommitWriter(GROUP_COMMIT_INTERVAL_SECONDS, GROUP_COMMIT_MAX_BATCH).start()
+        reminder_dispatcher.start()
+    print("Dispatcher started successfully")
+except Exception as e:
+    print(f"Error starting dispatcher: {e}")
+
+# Fixed replies are serialized to TwiML once at startup
+WELCOME_REPLY = twiml.render_message("Welcome to RemindMe! 📅\n\nTo set a reminder with consecutive notifications, send:\n'remind' or 'set reminder'\n\nI'll guide you through setting the date, time, and message for your reminder.\n\nOr use the quick format for simple reminders:\nremind me at HH:MM Your message\nor just write it, e.g. 'call mom tomorrow at 5pm'\n\nFor repeating reminders:\ndaily at HH:MM Your message\nevery monday at HH:MM Your message\n\nSend 'list reminders' to see your upcoming reminders.")
+CANCELED_REPLY = twiml.render_message("Reminder setup canceled. Send 'remind' to start a new reminder.")
+DATE_PROMPT_REPLY = twiml.render_message("📅 What date do you want to be reminded on? (e.g., 26 Aug 2025, 26/08/2025)")
+DATE_ERROR_REPLY = twiml.render_message("I couldn't understand that date format. Please try again with a format like:\n- 26 Aug 2025\n- 26/08/2025\n- August 26\n\nType 'cancel' to start over.")
+TIME_PROMPT_REPLY = twiml.render_message("⏰ What time would you like to be reminded? (e.g., 14:30 or 2:30)")
+TIME_RANGE_ERROR_REPLY = twiml.render_message("Invalid time. Please enter a valid time in 24-hour format (e.g., 14:30) or 12-hour format (e.g., 2:30).\n\nType 'cancel' to start over.")
+TIME_FORMAT_ERROR_REPLY = twiml.render_message("I couldn't understand that time format. Please use HH:MM format (e.g., 14:30 or 2:30).\n\nType 'cancel' to start over.")
+QUICK_FORMAT_ERROR_REPLY = twiml.render_message("Invalid format. Use: remind me at HH:MM Your message")
+RECURRING_FORMAT_ERROR_REPLY = twiml.render_message("I couldn't understand that repeating reminder. Try for example:\n- daily at 08:30 Take vitamins\n- every monday at 9am Team standup\n- every mon-fri at 07:15 Walk the dog\n- every mon, wed and fri at 18:00 Gym until 31 Dec 2025")
+RECURRING_ENDED_REPLY = twiml.render_message("That repeating reminder would already have ended, so I didn't set it.")
+NO_REMINDERS_REPLY = twiml.render_message("You have no upcoming reminders. Send 'remind' to set one.")
+NO_MORE_REMINDERS_REPLY = twiml.render_message("That's all your upcoming reminders. Send 'list reminders' to start again.")
+SNOOZE_RANGE_ERROR_REPLY = twiml.render_message(f"You can snooze a reminder by 1 to {MAX_SNOOZE_MINUTES} minutes (one year), e.g. 'snooze 3 30'.")
+REMINDER_NOT_FOUND_REPLY = twiml.render_message("I couldn't find that reminder. Send 'list reminders' to see your reminders and their numbers.")
+WRITES_PENDING_REPLY = twiml.render_message("Your latest reminders are still being saved. Please try again in a moment.")
+LIST_UNAVAILABLE_REPLY = twiml.render_message("Listing, canceling and snoozing reminders needs the database reminder backend.")
+
+def twiml_response(body):
+    return Response(body, mimetype="application/xml")
+
+# Gauges are read when /metrics is scraped, never on the request path
+metrics.Gauge(
+    "remindme_pending_reminders",
+    "Reminders scheduled but not yet sent",
+    lambda: len(wheel) if REMINDER_BACKEND == "memory" else database.count_pending()
+)
+metrics.Gauge("remindme_delivery_queue_depth", "Reminders waiting for a sender thread", lambda: pipeline.queue.qsize())
+metrics.Gauge("remindme_coalescer_waiting", "Recipients with reminders held for a digest", lambda: len(coalescer.pending) if coalescer else 0)
+metrics.Gauge("remindme_coalesced_sends_saved_total", "Sends avoided by combining reminders into digests", lambda: coalescer.stats["saved"] if coalescer else 0, kind="counter")
+metrics.Gauge("remindme_write_queue_depth", "Reminder writes acknowledged but not yet committed", lambda: writes.queue.qsize() if writes else 0)
+metrics.Gauge("remindme_nlu_cache_hit_ratio", "Share of model-bound messages answered from the cache", lambda: understander.cache_hit_ratio if understander else 0)
+metrics.Gauge("remindme_nlu_model_calls_saved_total", "Model calls avoided by the local parser, the cache and batching", lambda: understander.model_calls_saved if understander else 0, kind="counter")
+metrics.Gauge("remindme_active_sessions", "Senders part-way through setting up a reminder", lambda: len(sessions))
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/", methods=["POST"])
+def bot():
+    metrics.WEBHOOK_REQUESTS.inc()
+    user_msg = request.values.get("Body", "").strip()
+    from_number = request.values.get("From", "")
+    message_sid = request.values.get("MessageSid", "")
+
+    # Twilio retries slow webhooks with the same MessageSid; replay the first reply instead of scheduling twice
+    reply = webhook_dedupe.run_once(message_sid, lambda: handle_message(user_msg, from_number))
+    return twiml_response(reply)
+
+def handle_message(user_msg, from_number):
+    """Advance the sender's conversation and return the TwiML reply"""
+    started = time.perf_counter()
+    # Senders without a stored session are in the initial state
+    user_state = sessions.get(from_number) or session_store.Session(STATE_INITIAL)
+    state = user_state.state
+    try:
+        return converse(user_msg, from_number, user_state)
+    finally:
+        metrics.WEBHOOK_LATENCY.labels(state).observe(time.perf_counter() - started)
+
+def converse(user_msg, from_number, user_state):
+    # Handle commands
+    if user_msg.lower() == "cancel":
+        sessions.delete(from_number)
+        return CANCELED_REPLY
+    
+    # Always start with date when setting a reminder
+    if user_msg.lower() == "remind" or user_msg.lower() == "set reminder" or user_msg.lower() == "set a reminder":
+        sessions.put(from_number, session_store.Session(STATE_AWAITING_DATE))
+        return DATE_PROMPT_REPLY
+    
+    # Handle conversation states
+    if user_state.state == STATE_AWAITING_DATE:
+        parsed_date = date_parser.parse_date(user_msg)
+        if parsed_date:
+            user_state.date = parsed_date.isoformat()
+            user_state.state = STATE_AWAITING_TIME
+            sessions.put(from_number, user_state)
+            reply = TIME_PROMPT_REPLY
+        else:
+            reply = DATE_ERROR_REPLY
+    
+    elif user_state.state == STATE_AWAITING_TIME:
+        # Try to parse time (HH:MM)
+        parsed_time = date_parser.parse_time(user_msg)
+        if parsed_time:
+            hour, minute = parsed_time
+            if 0 <= hour <= 23 and 0 <= minute <= 59:
+                time_str = f"{hour:02d}:{minute:02d}"
+                user_state.time = time_str
+                user_state.state = STATE_AWAITING_MESSAGE
+                sessions.put(from_number, user_state)
+                
+                # Format the date for display
+                date_obj = datetime.fromisoformat(user_state.date)
+                formatted_date = date_obj.strftime("%d %b %Y")
+                
+                reply = twiml.render_message(f"📝 Finally, what would you like to be reminded about on {formatted_date} at {time_str}?")
+            else:
+                reply = TIME_RANGE_ERROR_REPLY
+        else:
+            reply = TIME_FORMAT_ERROR_REPLY
+    
+    elif user_state.state == STATE_AWAITING_MESSAGE:
+        # Save the reminder message and schedule reminders
+        reminder_data = {'date': user_state.date, 'time': user_state.time, 'msg': user_msg}
+        
+        # Schedule consecutive reminders
+        reminder_dates = schedule_consecutive_reminders(
+            from_number,
+            reminder_data['msg'],
+            reminder_data['date'],
+            reminder_data['time']
+        )
+        
+        # Format response message
+        target_date = reminder_dates[-1]
+        days_until = (target_date.date() - datetime.now().date()).days
+        
+        if days_until <= 0:
+            msg = f"✅ Reminder set for today at {reminder_data['time']}:\n"
+        else:
+            msg = f"✅ Reminder set for {target_date.strftime('%d %b %Y')} at {reminder_data['time']}:\n"
+        
+        msg += f"📝 {reminder_data['msg']}\n\n"
+        
+        if len(reminder_dates) > 1:
+            msg += "You'll be reminded on:\n"
+            for reminder_date in reminder_dates:
+                msg += f"- {reminder_date.strftime('%d %b')} at {reminder_date.strftime('%H:%M')}\n"
+        
+        reply = twiml.render_message(msg)
+        
+        # Reset state
+        sessions.delete(from_number)
+    
+    else:  # STATE_INITIAL
+        command = user_msg.lower()
+        cancel_match = CANCEL_ID_PATTERN.fullmatch(command)
+        snooze_match = SNOOZE_PATTERN.fullmatch(command)
+        recurring_match = RECURRING_PATTERN.fullmatch(user_msg)
+        if recurring_match:
+            reply = recurring_reply(from_number, recurring_match)
+        elif command in LIST_COMMANDS or command == "more" or cancel_match or snooze_match:
+            # Make reminders this sender just set visible before reading them back
+            if writes and not writes.flush(GROUP_COMMIT_FLUSH_TIMEOUT_SECONDS):
+                print(f"Queued reminder writes not committed (writer {'running' if writes.is_alive() else 'stopped'})")
+                reply = WRITES_PENDING_REPLY
+            elif REMINDER_BACKEND == "memory":
+                reply = LIST_UNAVAILABLE_REPLY
+            elif cancel_match:
+                reply = cancel_reply(from_number, bounded_int(cancel_match.group(1), MAX_REMINDER_ID))
+            elif snooze_match:
+                minutes = bounded_int(snooze_match.group(2), MAX_SNOOZE_MINUTES) if snooze_match.group(2) else DEFAULT_SNOOZE_MINUTES
+                reply = snooze_reply(from_number, bounded_int(snooze_match.group(1), MAX_REMINDER_ID), minutes)
+            else:
+                reply = list_reply(from_number, user_state, more=command == "more")
+        elif user_msg.lower().startswith("remind me at"):
+            # Support for legacy format
+            try:
+                # Parse: "remind me at HH:MM message"
+                parts = user_msg.split(" ", 4)
+                time_part = parts[3]
+                msg_part = parts[4] if len(parts) > 4 else ""
+                remind_time = datetime.strptime(time_part, "%H:%M").replace(
+                    year=datetime.now().year,
+                    month=datetime.now().month,
+                    day=datetime.now().day
+                )
+                # If time already passed today, schedule for tomorrow
+                if remind_time < datetime.now():
+                    remind_time = remind_time.replace(day=remind_time.day + 1)
+                
+                # Schedule a single reminder
+                store_reminders(from_number, [(msg_part, remind_time)])
+                
+                reply = twiml.render_message(f"Okay, I'll remind you at {remind_time.strftime('%H:%M')} {msg_part} ✅")
+            except Exception as e:
+                # "remind me at 5pm to ..." and other phrasings the strict format can't read
+                reply = free_text_reply(from_number, user_msg, QUICK_FORMAT_ERROR_REPLY)
+        else:
+            reply = free_text_reply(from_number, user_msg, WELCOME_REPLY)
+
+    return reply
+
+def list_reply(from_number, user_state, more=False):
+    """Show one page of the sender's pending reminders, continuing from the stored cursor for 'more'"""
+    after = None
+    if more:
+        if not user_state.cursor:
+            return NO_MORE_REMINDERS_REPLY
+        after_time, after_id = user_state.cursor.rsplit("|", 1)
+        after = (after_time, int(after_id))
+
+    # Fetch one extra row to know whether there is another page
+    rows = database.list_reminders(from_number, after, LIST_PAGE_SIZE + 1)
+    has_more = len(rows) > LIST_PAGE_SIZE
+    rows = rows[:LIST_PAGE_SIZE]
+
+    if has_more:
+        last_id, _, last_time, _ = rows[-1]
+        user_state.cursor = f"{last_time}|{last_id}"
+        sessions.put(from_number, user_state)
+    elif user_state.cursor:
+        sessions.delete(from_number)
+
+    if not rows:
+        return NO_MORE_REMINDERS_REPLY if more else NO_REMINDERS_REPLY
+
+    msg = "📋 Your upcoming reminders:\n"
+    for reminder_id, message, reminder_time, rule in rows:
+        msg += f"#{reminder_id} {format_reminder_time(datetime.fromisoformat(reminder_time))} - {message}"
+        if rule:
+            msg += f" (🔁 {recurrence.RecurrenceRule.decode(rule).describe()})"
+        msg += "\n"
+    if has_more:
+        msg += "\nSend 'more' to see the next ones."
+    msg += "\nSend 'cancel <number>' or 'snooze <number> <minutes>' to change one."
+    return twiml.render_message(msg)
+
+def free_text_reply(from_number, user_msg, fallback):
+    """Set a one-off reminder from a message like 'call mom tomorrow at 5pm', or return `fallback`"""
+    understood = understander.understand(user_msg) if understander else None
+    if understood is None:
+        return fallback
+    message, remind_time = understood
+    store_reminders(from_number, [(message, remind_time)])
+    return twiml.render_message(f"✅ Okay, I'll remind you on {remind_time.strftime('%a %d %b at %H:%M')}:\n📝 {message}")
+
+def recurring_reply(from_number, match):
+    """Set up a repeating reminder from a RECURRING_PATTERN match"""
+    every = (1, 0) if match.group("daily") else recurrence.parse_every(match.group("every"))
+    # HH:MM as everywhere else, or the free-text path's 9am, 9.30pm and noon
+    parsed_time = date_parser.parse_time(match.group("time")) or nlu.parse_clock_time(match.group("time"))
+    if every is None or parsed_time is None:
+        return RECURRING_FORMAT_ERROR_REPLY
+    hour, minute = parsed_time
+    if not (0 <= hour <= 23 and 0 <= minute <= 59):
+        return TIME_RANGE_ERROR_REPLY
+
+    # An optional trailing "until <date>" ends the rule after that day
+    message, until = match.group("msg").strip(), None
+    head, separator, tail = message.rpartition(" until ")
+    if separator:
+        until_date = date_parser.parse_date(tail)
+        if until_date:
+            message, until = head.strip(), datetime.combine(until_date, datetime.max.time()).replace(microsecond=0)
+
+    interval, weekdays = every
+    rule = recurrence.RecurrenceRule(interval, weekdays, hour, minute, until)
+    first_time = store_recurring_reminder(from_number, message, rule)
+    if first_time is None:
+        return RECURRING_ENDED_REPLY
+    return twiml.render_message(
+        f"🔁 Okay, I'll remind you {rule.describe()}:\n📝 {message}\n\nFirst reminder: {first_time.strftime('%a %d %b at %H:%M')}"
+    )
+
+def bounded_int(digits, maximum):
+    """int(digits), or None if it is larger than `maximum`; very long inputs are never converted"""
+    if len(digits) > len(str(maximum)):
+        return None
+    value = int(digits)
+    return value if value <= maximum else None
+
+def format_reminder_time(when):
+    """Day, month and time, with the year only when it isn't this year"""
+    return when.strftime('%d %b %H:%M' if when.year == datetime.now().year else '%d %b %Y %H:%M')
+
+def cancel_reply(from_number, reminder_id):
+    if reminder_id is None or not database.cancel_reminder(from_number, reminder_id):
+        return REMINDER_NOT_FOUND_REPLY
+    return twiml.render_message(f"🗑️ Reminder #{reminder_id} canceled.")
+
+def snooze_reply(from_number, reminder_id, minutes):
+    if reminder_id is None:
+        return REMINDER_NOT_FOUND_REPLY
+    if not minutes:
+        return SNOOZE_RANGE_ERROR_REPLY
+    try:
+        reminder_time = database.snooze_reminder(from_number, reminder_id, minutes, datetime.now())
+    except OverflowError:
+        # Snoozed again and again until it would pass the year 9999
+        return SNOOZE_RANGE_ERROR_REPLY
+    if reminder_time is None:
+        return REMINDER_NOT_FOUND_REPLY
+    return twiml.render_message(f"😴 Reminder #{reminder_id} snoozed until {format_reminder_time(reminder_time)}.")
+
+if __name__ == "__main__":
+    app.run()
@@ -0,0 +1,69 @@
+"""Outbound sends saved by per-recipient coalescing during a peak minute.
+
+Simulates everyone's reminders landing at 09:00: most recipients have one,
+active users have several (including the "Upcoming"/"Coming up"/"Today"
+messages from consecutive reminders of different events). --max-pending
+caps the reminders held at once, as COALESCE_MAX_PENDING does; a cap below
+the size of the peak bounds memory and lease time at the cost of merging
+fewer reminders.
+
+Usage: python benchmarks/bench_coalescing.py [--recipients 10000] [--window 0.5] [--max-pending 1000]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import delivery
+
+def peak_minute(recipients):
+    reminders = []
+    reminder_id = 0
+    for i in range(recipients):
+        # Roughly 70% of recipients have a single reminder, a long tail has many
+        count = min(12, int(random.expovariate(1.2)) + 1)
+        for _ in range(count):
+            prefix = random.choice(["", "Today: ", "Coming up in 2 days: ", "Upcoming in 4 days: "])
+            reminders.append({"id": reminder_id, "to": f"whatsapp:+{i}", "msg": f"{prefix}reminder {reminder_id}"})
+            reminder_id += 1
+    random.shuffle(reminders)
+    return reminders
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recipients", type=int, default=10000)
+    parser.add_argument("--window", type=float, default=0.5)
+    parser.add_argument("--max-length", type=int, default=delivery.MAX_BODY_LENGTH)
+    parser.add_argument("--max-pending", type=int, default=1000)
+    args = parser.parse_args()
+
+    reminders = peak_minute(args.recipients)
+    sent = []
+    lock = threading.Lock()
+
+    def send(message):
+        with lock:
+            sent.append(message)
+
+    coalescer = delivery.Coalescer(send, args.window, args.max_length, args.max_pending).start()
+    begin = time.perf_counter()
+    for reminder in reminders:
+        coalescer.submit(reminder)
+    while coalescer.stats["reminders"] > sum(len(message.get("ids") or [message["id"]]) for message in sent):
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - begin
+
+    stats = coalescer.stats
+    longest = max(len(message.get("body") or message["msg"]) for message in sent)
+    print(f"reminders due:      {stats['reminders']}")
+    print(f"messages sent:      {stats['messages']}")
+    print(f"sends saved:        {stats['saved']} ({stats['saved'] / stats['reminders']:.0%})")
+    print(f"longest message:    {longest} chars (cap {args.max_length})")
+    print(f"drained in:         {elapsed:.2f}s with a {args.window}s window")
+
+if __name__ == "__main__":
+    main()
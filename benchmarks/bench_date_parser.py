@@ -0,0 +1,134 @@
+"""Correctness and throughput of date_parser against the original parse_date.
+
+Every corpus entry is checked against its expected date, and the original
+parser's answer is shown wherever it disagrees (it raises on month-first
+dates such as "August 26" and on unknown month names).
+
+Usage: python benchmarks/bench_date_parser.py [--rounds 200]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import date_parser
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "date_corpus.tsv")
+
+def legacy_parse_date(date_str):
+    """The parse_date that used to live in app.py, with its comments stripped, kept for comparison"""
+    date_patterns = [
+        r'(\d{1,2})[/-](\d{1,2})[/-](\d{4})',
+        r'(\d{1,2})[/-](\d{1,2})',
+        r'(\d{1,2})\s+([A-Za-z]+)\s+(\d{4})',
+        r'(\d{1,2})\s+([A-Za-z]+)',
+        r'([A-Za-z]+)\s+(\d{1,2})\s+(\d{4})',
+        r'([A-Za-z]+)\s+(\d{1,2})'
+    ]
+    for pattern in date_patterns:
+        match = re.search(pattern, date_str)
+        if match:
+            groups = match.groups()
+            current_year = datetime.now().year
+            if len(groups) == 3 and groups[2].isdigit() and len(groups[2]) == 4:
+                if groups[1].isdigit():
+                    day, month, year = int(groups[0]), int(groups[1]), int(groups[2])
+                else:
+                    if groups[0].isdigit():
+                        day, month_name, year = int(groups[0]), groups[1], int(groups[2])
+                        month = legacy_get_month_number(month_name)
+                    else:
+                        month_name, day, year = groups[0], int(groups[1]), int(groups[2])
+                        month = legacy_get_month_number(month_name)
+            elif len(groups) == 2:
+                if groups[1].isdigit():
+                    day, month, year = int(groups[0]), int(groups[1]), current_year
+                else:
+                    if groups[0].isdigit():
+                        day, month_name = int(groups[0]), groups[1]
+                        month = legacy_get_month_number(month_name)
+                    else:
+                        month_name, day = groups[0], int(groups[1])
+                        month = legacy_get_month_number(month_name)
+                    year = current_year
+            try:
+                date_obj = datetime(year, month, day)
+                return date_obj.strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+    return None
+
+def legacy_get_month_number(month_name):
+    month_name = month_name.lower()
+    months = {
+        'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3,
+        'apr': 4, 'april': 4, 'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
+        'aug': 8, 'august': 8, 'sep': 9, 'september': 9, 'oct': 10, 'october': 10,
+        'nov': 11, 'november': 11, 'dec': 12, 'december': 12
+    }
+    for key, value in months.items():
+        if month_name.startswith(key):
+            return value
+    return None
+
+def legacy_result(text):
+    try:
+        return legacy_parse_date(text)
+    except Exception as e:
+        return f"raises {type(e).__name__}"
+
+def load_corpus():
+    year = str(date.today().year)
+    entries = []
+    with open(CORPUS, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            text, expected = line.rstrip("\n").split("\t")
+            entries.append((text, None if expected == "None" else expected.replace("*", year)))
+    return entries
+
+def throughput(parse, inputs, rounds):
+    begin = time.perf_counter()
+    for _ in range(rounds):
+        for text in inputs:
+            try:
+                parse(text)
+            except Exception:
+                pass
+    return rounds * len(inputs) / (time.perf_counter() - begin)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    corpus = load_corpus()
+
+    failures = 0
+    for text, expected in corpus:
+        parsed = date_parser.parse_date(text)
+        got = parsed.isoformat() if parsed else None
+        legacy = legacy_result(text)
+        if got != expected:
+            failures += 1
+            print(f"WRONG   {text!r}: got {got}, expected {expected}")
+        elif legacy != expected:
+            print(f"fixed   {text!r}: {got} (original parse_date: {legacy})")
+    print(f"{len(corpus) - failures}/{len(corpus)} corpus entries correct")
+
+    inputs = [text for text, _ in corpus]
+    legacy_rate = throughput(legacy_parse_date, inputs, args.rounds)
+    cached_rate = throughput(date_parser.parse_date, inputs, args.rounds)
+    date_parser._parse_normalized.cache_clear()
+    uncached_rate = throughput(lambda text: date_parser._parse_normalized.__wrapped__(text.strip().lower(), date.today().year), inputs, args.rounds)
+    print(f"original parse_date: {legacy_rate:>10.0f} parses/s")
+    print(f"date_parser, uncached: {uncached_rate:>8.0f} parses/s")
+    print(f"date_parser, cached: {cached_rate:>10.0f} parses/s")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
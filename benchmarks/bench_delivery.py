@@ -0,0 +1,46 @@
+"""Throughput of the delivery pipeline against the local fake Twilio server.
+
+Usage: python benchmarks/bench_delivery.py [--messages 2000] [--latency 0.05] [--rate-limit-ratio 0.05]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import delivery
+from fake_twilio import FakeTwilioServer
+
+def run(server, messages, workers, rate):
+    sender = delivery.TwilioSender("ACbench", "token", "whatsapp:+10000000000", base_url=server.base_url, pool_size=workers)
+    pipeline = delivery.DeliveryPipeline(sender, workers=workers, rate=rate, base_delay=0.01, max_delay=0.2).start()
+    server.received.clear()
+    start = time.perf_counter()
+    # The pipeline prints every send, which would dominate the measurement
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(messages):
+            pipeline.submit({"to": f"whatsapp:+{i}", "msg": "bench"})
+        pipeline.join()
+    elapsed = time.perf_counter() - start
+    return messages / elapsed, pipeline.stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=10000)
+    args = parser.parse_args()
+
+    server = FakeTwilioServer(("127.0.0.1", 0), args.latency, args.rate_limit_ratio).start()
+    print(f"{'workers':>8} {'msgs/s':>10} {'sent':>6} {'retried':>8} {'failed':>7} {'deferred':>9}")
+    for workers in (1, 4, 16, 64):
+        rate, stats = run(server, args.messages, workers, args.rate)
+        print(f"{workers:>8} {rate:>10.0f} {stats['sent']:>6} {stats['retried']:>8} {stats['failed']:>7} {stats['deferred']:>9}")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
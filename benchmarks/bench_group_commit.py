@@ -0,0 +1,83 @@
+"""Webhook latency and reminder writes per second with and without group commit.
+
+Concurrent senders post "remind me at" webhooks through the Flask app.
+In the synchronous mode every webhook commits its own reminder before
+replying; with ASYNC_WRITES the webhook only queues the insert and the
+background writer commits batches. Writes per second count until every
+reminder is committed. --synchronous FULL makes every commit wait for
+fsync, as a database on slow or network storage would.
+
+Usage: python benchmarks/bench_group_commit.py [--requests 5000] [--threads 16] [--synchronous NORMAL]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def run(app, database, requests, threads, offset):
+    local = threading.local()
+
+    def post(i):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.app.test_client()
+        start = time.perf_counter()
+        client.post("/", data={"Body": f"remind me at 23:59 task {i}", "From": f"whatsapp:+{offset + i % 1000}"})
+        return time.perf_counter() - start
+
+    conn = database.get_connection()
+    before = conn.execute("SELECT COUNT(*) FROM reminders").fetchone()[0]
+    begin = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = sorted(pool.map(post, range(requests)))
+    if app.writes:
+        app.writes.flush()
+    elapsed = time.perf_counter() - begin
+    written = conn.execute("SELECT COUNT(*) FROM reminders").fetchone()[0] - before
+    return latencies, written, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--synchronous", default="NORMAL", choices=["OFF", "NORMAL", "FULL"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the dispatcher from sending anything while the test runs
+        os.environ.update(DATABASE_PATH=os.path.join(tmp, "bench.db"), DISPATCH_POLL_INTERVAL="3600", ASYNC_WRITES="1")
+        import database
+        connect = database.connect
+
+        def connect_with_sync(path=None):
+            conn = connect(path)
+            conn.execute(f"PRAGMA synchronous={args.synchronous}")
+            return conn
+        database.connect = connect_with_sync
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app
+        writer = app.writes
+
+        print(f"{'mode':>18} {'p50 ms':>8} {'p99 ms':>8} {'writes/s':>10} {'commits':>8}")
+        for offset, (name, writes) in enumerate([("commit per request", None), ("group commit", writer)]):
+            app.writes = writes
+            commits_before = writer.stats["commits"]
+            latencies, written, elapsed = run(app, database, args.requests, args.threads, offset * 1000)
+            commits = writer.stats["commits"] - commits_before if writes else written
+            print(f"{name:>18} {percentile(latencies, 0.5) * 1000:>8.2f} {percentile(latencies, 0.99) * 1000:>8.2f} "
+                  f"{written / elapsed:>10.0f} {commits:>8}")
+        writer.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""List, deep-page and cancel latency for one heavy user as the reminder table grows.
+
+A single user holds a few thousand pending reminders among everybody
+else's. Listing the first page, a page deep into their reminders (via the
+keyset cursor) and canceling one by id should all take the same time
+whatever the total size of the table.
+
+Usage: python benchmarks/bench_list_reminders.py [total reminders...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database
+
+USERS = 10000
+HEAVY_USER = "whatsapp:+heavy"
+HEAVY_REMINDERS = 5000
+INSERT_BATCH = 1000
+PAGE_SIZE = 10
+
+def fill(conn, size, now):
+    inserted = 0
+    while inserted < size:
+        count = min(INSERT_BATCH, size - inserted)
+        reminders = [
+            (f"bench reminder {inserted + i}", now + timedelta(minutes=random.randint(1, 365 * 24 * 60)))
+            for i in range(count)
+        ]
+        database.add_reminders(f"whatsapp:+{random.randrange(USERS)}", reminders, conn)
+        inserted += count
+    heavy = [
+        (f"heavy reminder {i}", now + timedelta(minutes=random.randint(1, 365 * 24 * 60)))
+        for i in range(HEAVY_REMINDERS)
+    ]
+    return database.add_reminders(HEAVY_USER, heavy, conn)
+
+def p50_ms(func, rounds=200):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    now = datetime.now()
+    print(f"{'total':>10} {'first page ms':>14} {'deep page ms':>13} {'cancel ms':>10}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            database.create_database(path)
+            conn = database.connect(path)
+            heavy_ids = fill(conn, size, now)
+
+            # Walk most of the way through the heavy user's reminders to get a deep cursor
+            deep = database.list_reminders(HEAVY_USER, None, HEAVY_REMINDERS - PAGE_SIZE, conn)[-1]
+            deep_cursor = (deep[2], deep[0])
+
+            first_page = p50_ms(lambda: database.list_reminders(HEAVY_USER, None, PAGE_SIZE + 1, conn))
+            deep_page = p50_ms(lambda: database.list_reminders(HEAVY_USER, deep_cursor, PAGE_SIZE + 1, conn))
+            to_cancel = iter(random.sample(heavy_ids, 200))
+            cancel = p50_ms(lambda: database.cancel_reminder(HEAVY_USER, next(to_cancel), conn))
+            print(f"{size:>10} {first_page:>14.3f} {deep_page:>13.3f} {cancel:>10.3f}")
+            conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Several dispatcher processes sharing one SQLite file.
+
+Each worker records every reminder it sends. One extra worker claims a batch
+and dies without sending it, so its lease has to expire and be picked up by
+the others. The run reports throughput and any duplicate or lost sends.
+
+Usage: python benchmarks/bench_multiworker.py [--reminders 5000] [--send-delay 0.002]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database
+import dispatcher
+
+LEASE_SECONDS = 2
+
+def run_worker(db_path, log_path, send_delay):
+    os.environ["DATABASE_PATH"] = db_path
+    log = open(log_path, "a", buffering=1)
+
+    def send(reminder):
+        time.sleep(send_delay)
+        log.write(f"{reminder['id']}\n")
+        worker.delivered(reminder)
+
+    worker = dispatcher.Dispatcher(send, batch_size=50, lease_seconds=LEASE_SECONDS)
+    while True:
+        worker.flush()
+        if worker.dispatch_due_reminders() == 0:
+            if database.count_pending() == 0:
+                break
+            # Everything left is leased to someone else, wait for it to be sent or expire
+            time.sleep(0.1)
+    worker.flush()
+    log.close()
+
+def run_crashing_worker(db_path):
+    os.environ["DATABASE_PATH"] = db_path
+    database.claim_due_reminders("crashed-worker", datetime.now(), 200, LEASE_SECONDS)
+    os._exit(1)
+
+def run(workers, reminders, send_delay):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "reminders.db")
+        database.create_database(db_path)
+        conn = database.connect(db_path)
+        due = datetime.now() - timedelta(minutes=1)
+        for start in range(0, reminders, 1000):
+            batch = [(f"reminder {i}", due) for i in range(start, min(start + 1000, reminders))]
+            database.add_reminders(f"whatsapp:+{start}", batch, conn)
+        expected = {row[0] for row in conn.execute("SELECT id FROM reminders")}
+
+        crasher = multiprocessing.Process(target=run_crashing_worker, args=(db_path,))
+        crasher.start()
+        crasher.join()
+
+        begin = time.perf_counter()
+        logs = [os.path.join(tmp, f"worker-{i}.log") for i in range(workers)]
+        processes = [
+            multiprocessing.Process(target=run_worker, args=(db_path, log, send_delay))
+            for log in logs
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - begin
+
+        sends = Counter()
+        for log in logs:
+            if os.path.exists(log):
+                with open(log) as f:
+                    sends.update(int(line) for line in f)
+        duplicates = sum(1 for count in sends.values() if count > 1)
+        lost = len(expected - set(sends))
+        conn.close()
+        return reminders / elapsed, duplicates, lost
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reminders", type=int, default=5000)
+    parser.add_argument("--send-delay", type=float, default=0.002)
+    args = parser.parse_args()
+    print(f"{'workers':>8} {'sends/s':>10} {'duplicates':>11} {'lost':>6}")
+    failed = False
+    for workers in (1, 2, 4, 8):
+        rate, duplicates, lost = run(workers, args.reminders, args.send_delay)
+        failed = failed or duplicates or lost
+        print(f"{workers:>8} {rate:>10.0f} {duplicates:>11} {lost:>6}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
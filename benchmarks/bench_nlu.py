@@ -0,0 +1,126 @@
+"""Model calls saved by the local parser, the normalized-text cache and micro-batching.
+
+Replays a stream of free-text reminder requests from many concurrent
+senders. Some carry a clock time the local parser reads; the rest only a
+model understands, and are answered by the offline stub backend with a
+simulated model latency. Popular phrasings repeat with different casing,
+spacing and punctuation, as real users' messages do. Before that, every
+entry in nlu_corpus.tsv is checked against the local parser, and the
+script exits non-zero if any is wrong.
+
+Usage: python benchmarks/bench_nlu.py [--messages 20000] [--threads 32] [--latency 0.3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import nlu
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nlu_corpus.tsv")
+CORPUS_NOW = datetime(2026, 10, 17, 12, 0)
+TASKS = ["call mom", "take my pills", "water the plants", "pay rent", "stretch", "the laundry", "gym",
+         "team standup", "buy milk", "dentist appointment", "feed the cat", "submit the report"]
+LOCAL_TEMPLATES = ["remind me to {task} tomorrow at {hour}pm", "{task} at {hour}:30", "{task} on friday at {hour}am"]
+MODEL_PHRASES = {
+    "this evening": {"time": "19:00"},
+    "tomorrow morning": {"time": "08:00"},
+    "tonight": {"time": "21:00"},
+    "in twenty minutes": {"minutes_from_now": 20},
+    "in an hour": {"minutes_from_now": 60},
+}
+MODEL_TEMPLATES = ["ping me about {task} {phrase}", "don't let me forget to {task} {phrase}", "nudge me to {task} {phrase}"]
+
+def load_corpus():
+    entries = []
+    with open(CORPUS, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            text, message, when = line.rstrip("\n").split("\t")
+            entries.append((text, None if when == "None" else (message, datetime.strptime(when, "%Y-%m-%d %H:%M"))))
+    return entries
+
+def check_corpus():
+    """Number of corpus entries the local parser gets wrong"""
+    corpus = load_corpus()
+    failures = 0
+    for text, expected in corpus:
+        interpretation = nlu.parse_local(text, CORPUS_NOW)
+        got = interpretation.resolve(CORPUS_NOW) if interpretation else None
+        if got != expected:
+            failures += 1
+            print(f"WRONG   {text!r}: got {got}, expected {expected}")
+    print(f"{len(corpus) - failures}/{len(corpus)} local parser corpus entries correct")
+    return failures
+
+def vary(text):
+    """Same request, different surface form"""
+    text = text.capitalize() if random.random() < 0.5 else text
+    if random.random() < 0.3:
+        text = text.replace(" ", "  ", 1)
+    return text + random.choice(["", "", ".", "!"])
+
+def workload(count):
+    # Popular tasks are asked for far more often than rare ones
+    weights = [1 / (rank + 1) for rank in range(len(TASKS))]
+    messages, responses = [], {}
+    for _ in range(count):
+        task = random.choices(TASKS, weights)[0]
+        if random.random() < 0.5:
+            text = random.choice(LOCAL_TEMPLATES).format(task=task, hour=random.randint(1, 11))
+        else:
+            phrase = random.choice(list(MODEL_PHRASES))
+            text = random.choice(MODEL_TEMPLATES).format(task=task, phrase=phrase)
+            responses[nlu.normalize(text)] = nlu.Interpretation.from_dict({"message": task, **MODEL_PHRASES[phrase]})
+        messages.append(vary(text))
+    return messages, responses
+
+def run(messages, backend, cache_size, window, max_batch, threads):
+    understander = nlu.ReminderUnderstanding(backend, cache_size, window, max_batch)
+    now = datetime.now()
+
+    def understand(text):
+        start = time.perf_counter()
+        result = understander.understand(text, now)
+        return time.perf_counter() - start, result is not None
+
+    begin = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(understand, messages))
+    elapsed = time.perf_counter() - begin
+    latencies = sorted(latency for latency, _ in results)
+    understood = sum(ok for _, ok in results)
+    return understander, understood, latencies, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--window", type=float, default=0.02)
+    parser.add_argument("--max-batch", type=int, default=16)
+    args = parser.parse_args()
+    failures = check_corpus()
+
+    messages, responses = workload(args.messages)
+    print(f"{args.messages} messages, {len(set(map(nlu.normalize, messages)))} distinct after normalizing, "
+          f"{args.latency * 1000:.0f} ms per model call; one call per message would be {args.messages} calls")
+    print(f"{'setup':>22} {'understood':>10} {'local':>6} {'hit %':>6} {'calls':>6} {'saved':>7} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {'msg/s':>7}")
+    for name, cache_size in [("local + batching", 0), ("local + cache + batch", 10000)]:
+        backend = nlu.StubBackend(responses, args.latency)
+        understander, understood, latencies, elapsed = run(messages, backend, cache_size, args.window, args.max_batch, args.threads)
+        print(f"{name:>22} {understood:>10} {understander.stats['local']:>6} {understander.cache_hit_ratio:>6.1%} "
+              f"{understander.model_calls:>6} {understander.model_calls_saved:>7} "
+              f"{latencies[len(latencies) // 2] * 1000:>7.2f} {latencies[int(len(latencies) * 0.99)] * 1000:>7.1f} "
+              f"{len(messages) / elapsed:>7.0f}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Memory and per-tick expansion cost of recurring reminders stored as rules.
+
+Schedules a mix of daily, weekday, weekly and every-few-days rules, one
+wheel entry or database row each, and then runs a simulated day of
+minute ticks in which every fired rule computes and schedules only its
+next occurrence. The memory that expanding a year of occurrences up
+front would take is estimated from a sample of the rules.
+
+Usage: python benchmarks/bench_recurrence.py [--rules 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database
+import recurrence
+import timing_wheel
+
+SAMPLE = 1000
+
+def random_rule():
+    hour, minute = random.randrange(24), random.randrange(60)
+    kind = random.random()
+    if kind < 0.5:
+        return recurrence.RecurrenceRule(1, 0, hour, minute)
+    if kind < 0.7:
+        return recurrence.RecurrenceRule(1, recurrence.WEEKDAYS, hour, minute)
+    if kind < 0.9:
+        return recurrence.RecurrenceRule(1, 1 << random.randrange(7), hour, minute)
+    return recurrence.RecurrenceRule(random.randint(2, 14), 0, hour, minute)
+
+def occurrences_in_year(rule, now):
+    count, occurrence, end = 0, rule.first_after(now), now + timedelta(days=365)
+    while occurrence and occurrence <= end:
+        count += 1
+        occurrence = rule.next_occurrence(occurrence, occurrence)
+    return count
+
+def bench_wheel(rules, now):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    wheel = timing_wheel.TimingWheel(now)
+    for i, rule in enumerate(rules):
+        wheel.schedule(rule.first_after(now), f"whatsapp:+{i}", f"recurring reminder {i}", rule)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    # One simulated day of minute ticks; every fired rule schedules its next occurrence
+    tick_times, fired = [], 0
+    for minute in range(1, 24 * 60 + 1):
+        tick = now + timedelta(minutes=minute)
+        start = time.perf_counter()
+        for entry in wheel.advance(tick):
+            due = timing_wheel.datetime_of(entry.due)
+            next_time = entry.rule.next_occurrence(due, tick)
+            if next_time:
+                wheel.schedule(next_time, entry.to, entry.msg, entry.rule)
+            fired += 1
+        tick_times.append(time.perf_counter() - start)
+    return wheel, used, tick_times, fired
+
+def bench_sqlite(rules, now, batch_size=500):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        database.create_database(path)
+        conn = database.connect(path)
+        with conn:
+            for i, rule in enumerate(rules):
+                database.add_recurring_reminder(f"whatsapp:+{i}", f"recurring reminder {i}", rule, rule.first_after(now), conn)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        size = os.path.getsize(path)
+
+        # Fire everything due over the next day in dispatcher-sized batches
+        tick = now + timedelta(days=1)
+        batch_times, fired = [], 0
+        while True:
+            start = time.perf_counter()
+            rows = database.claim_due_reminders("bench", tick, batch_size, conn=conn)
+            if not rows:
+                break
+            database.mark_sent([row[0] for row in rows], "bench", tick, conn)
+            batch_times.append(time.perf_counter() - start)
+            fired += len(rows)
+        rows_left = conn.execute("SELECT COUNT(*) FROM reminders WHERE is_sent = 0").fetchone()[0]
+        conn.close()
+    return size, batch_times, fired, rows_left
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rules", type=int, default=100000)
+    args = parser.parse_args()
+
+    now = datetime.now().replace(second=0, microsecond=0)
+    rules = [random_rule() for _ in range(args.rules)]
+    sample = random.sample(rules, min(SAMPLE, len(rules)))
+    per_year = sum(occurrences_in_year(rule, now) for rule in sample) / len(sample)
+
+    wheel, used, tick_times, fired = bench_wheel(rules, now)
+    busiest = max(tick_times)
+    print(f"timing wheel, {args.rules} rules:")
+    print(f"  memory:                  {used / 2**20:.1f} MB ({used / args.rules:.0f} bytes per rule)")
+    print(f"  entries after one day:   {len(wheel)} (one per active rule)")
+    print(f"  expanded up front:       ~{per_year * args.rules:,.0f} entries for one year, "
+          f"~{per_year * used / 2**20:.0f} MB at the same size per entry")
+    print(f"  fired over one day:      {fired}")
+    print(f"  per tick:                mean {sum(tick_times) / len(tick_times) * 1000:.2f} ms, "
+          f"max {busiest * 1000:.2f} ms")
+    print(f"  per fired rule:          {sum(tick_times) / max(fired, 1) * 1e6:.1f} us")
+
+    size, batch_times, fired, pending = bench_sqlite(rules, now)
+    print(f"sqlite, {args.rules} rules:")
+    print(f"  database size:           {size / 2**20:.1f} MB ({size / args.rules:.0f} bytes per rule)")
+    print(f"  rows after one day:      {pending} (one per active rule)")
+    print(f"  fired over one day:      {fired} in {len(batch_times)} batches")
+    print(f"  per batch (claim+advance): mean {sum(batch_times) / len(batch_times) * 1000:.1f} ms, "
+          f"max {max(batch_times) * 1000:.1f} ms")
+    print(f"  per fired rule:          {sum(batch_times) / max(fired, 1) * 1e6:.1f} us")
+
+if __name__ == "__main__":
+    main()
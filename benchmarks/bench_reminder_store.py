@@ -0,0 +1,77 @@
+"""Insert rate, due-claim latency and RSS of the SQLite reminder store.
+
+Usage: python benchmarks/bench_reminder_store.py [queue sizes...]
+"""
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import database
+
+USERS = 10000
+INSERT_BATCH = 1000
+SCAN_BATCH = 500
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Fall back to peak RSS where /proc is not available (kilobytes on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def fill(conn, size, now):
+    """Insert `size` pending reminders spread over the next 30 days, 1% already due"""
+    start = time.perf_counter()
+    inserted = 0
+    while inserted < size:
+        count = min(INSERT_BATCH, size - inserted)
+        reminders = []
+        for _ in range(count):
+            if random.random() < 0.01:
+                run_date = now - timedelta(minutes=random.randint(0, 60))
+            else:
+                run_date = now + timedelta(minutes=random.randint(1, 30 * 24 * 60))
+            reminders.append((f"bench reminder {inserted}", run_date))
+        database.add_reminders(f"whatsapp:+{random.randrange(USERS)}", reminders, conn)
+        inserted += count
+    return size / (time.perf_counter() - start)
+
+def scan(conn, now, rounds=20):
+    """Time the dispatcher's claim of one batch, releasing the leases between rounds"""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        database.claim_due_reminders("bench", now, SCAN_BATCH, conn=conn)
+        timings.append(time.perf_counter() - start)
+        with conn:
+            conn.execute("UPDATE reminders SET lease_owner = NULL, lease_expires = NULL WHERE lease_owner = 'bench'")
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000, 1000000]
+    now = datetime.now()
+    print(f"{'pending':>10} {'inserts/s':>12} {'claim p50 ms':>12} {'RSS MB':>8}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            database.create_database(path)
+            conn = database.connect(path)
+            rate = fill(conn, size, now)
+            latency = scan(conn, now)
+            print(f"{size:>10} {rate:>12.0f} {latency:>12.2f} {current_rss_mb():>8.1f}")
+            conn.close()
+
+if __name__ == "__main__":
+    main()
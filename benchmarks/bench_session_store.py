@@ -0,0 +1,66 @@
+"""Memory and get/put latency of the conversation session stores.
+
+Usage: python benchmarks/bench_session_store.py [--senders 1000000] [--sqlite-senders 100000]
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import session_store
+
+def senders(count):
+    return [f"whatsapp:+91{i:010d}" for i in range(count)]
+
+def time_ops(store, keys, rounds=100000):
+    sample = keys[:rounds]
+    begin = time.perf_counter()
+    for key in sample:
+        store.put(key, session_store.Session("awaiting_time", "2025-08-26"))
+    put_us = (time.perf_counter() - begin) / len(sample) * 1e6
+    begin = time.perf_counter()
+    for key in sample:
+        store.get(key)
+    get_us = (time.perf_counter() - begin) / len(sample) * 1e6
+    return put_us, get_us
+
+def bench_memory(count):
+    keys = senders(count)
+    gc.collect()
+    tracemalloc.start()
+    store = session_store.MemorySessionStore(ttl=3600, max_entries=count)
+    for key in keys:
+        store.put(key, session_store.Session("awaiting_time", "2025-08-26"))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    put_us, get_us = time_ops(store, keys)
+    return size / count, put_us, get_us
+
+def bench_sqlite(count):
+    keys = senders(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = session_store.SQLiteSessionStore(ttl=3600, max_entries=count, path=os.path.join(tmp, "sessions.db"))
+        put_us, get_us = time_ops(store, keys, rounds=count)
+    return put_us, get_us
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--senders", type=int, default=1000000)
+    parser.add_argument("--sqlite-senders", type=int, default=100000)
+    args = parser.parse_args()
+
+    # Sender ids themselves are excluded by building them before tracing starts
+    per_session, put_us, get_us = bench_memory(args.senders)
+    print(f"memory store, {args.senders} senders: {per_session:.0f} bytes/session, "
+          f"put {put_us:.2f} us, get {get_us:.2f} us")
+
+    put_us, get_us = bench_sqlite(args.sqlite_senders)
+    print(f"sqlite store, {args.sqlite_senders} senders: put {put_us:.2f} us, get {get_us:.2f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Timing wheel versus one APScheduler date job per reminder.
+
+Measures schedule throughput, memory per pending reminder and the cost of
+firing one minute's bucket with a large number of reminders pending.
+Pass --drift to also measure real firing drift (waits for the next minute).
+
+Usage: python benchmarks/bench_timing_wheel.py [--entries 1000000] [--apscheduler-entries 20000] [--drift]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import timing_wheel
+
+def fire_times(count, start):
+    # Minute-resolution fire times spread over the next 30 days
+    return [start + timedelta(minutes=random.randint(1, 30 * 24 * 60)) for _ in range(count)]
+
+def measure(schedule_all):
+    gc.collect()
+    tracemalloc.start()
+    begin = time.perf_counter()
+    holder = schedule_all()
+    elapsed = time.perf_counter() - begin
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return holder, elapsed, size
+
+def bench_wheel(count, start):
+    times = fire_times(count, start)
+    # tracemalloc slows allocation, so time the schedule loop separately
+    wheel = timing_wheel.TimingWheel(start)
+    begin = time.perf_counter()
+    for run_date in times:
+        wheel.schedule(run_date, "whatsapp:+10000000000", "bench")
+    rate = count / (time.perf_counter() - begin)
+    del wheel
+
+    def schedule_all():
+        wheel = timing_wheel.TimingWheel(start)
+        for run_date in times:
+            wheel.schedule(run_date, "whatsapp:+10000000000", "bench")
+        return wheel
+    wheel, _, size = measure(schedule_all)
+
+    # Cost of a tick: advance one minute and collect that minute's bucket
+    ticks = []
+    now = start
+    for _ in range(120):
+        now += timedelta(minutes=1)
+        begin = time.perf_counter()
+        wheel.advance(now)
+        ticks.append(time.perf_counter() - begin)
+    ticks.sort()
+    return rate, size / count, ticks[len(ticks) // 2] * 1e6, ticks[-1] * 1e6
+
+def bench_apscheduler(count, start):
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    times = fire_times(count, start)
+
+    def schedule_all():
+        scheduler = BackgroundScheduler()
+        scheduler.start(paused=True)
+        for run_date in times:
+            scheduler.add_job(print, 'date', run_date=run_date, args=[{"to": "whatsapp:+10000000000", "msg": "bench"}])
+        return scheduler
+    scheduler, elapsed, size = measure(schedule_all)
+    scheduler.shutdown(wait=False)
+    return count / elapsed, size / count
+
+def drift_wheel(count, pending):
+    """Schedule `count` reminders for the next minute behind `pending` later ones and time how late the bucket arrives"""
+    wheel = timing_wheel.TimingWheel()
+    later = datetime.now().replace(second=0, microsecond=0) + timedelta(minutes=2)
+    for run_date in fire_times(pending, later):
+        wheel.schedule(run_date, "whatsapp:+10000000000", "bench")
+    # Pick the target after preloading, which can take a few seconds
+    target = datetime.now().replace(second=0, microsecond=0) + timedelta(minutes=1)
+    for _ in range(count):
+        wheel.schedule(target, "whatsapp:+10000000000", "bench")
+    done = threading.Event()
+    lag = []
+
+    def send_batch(entries):
+        lag.append(((datetime.now() - target).total_seconds(), len(entries)))
+        done.set()
+    timing_wheel.start_wheel(wheel, send_batch)
+    done.wait(120)
+    return lag[0]
+
+def drift_apscheduler(count):
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    scheduler = BackgroundScheduler()
+    scheduler.start()
+    target = datetime.now() + timedelta(seconds=5)
+    lags = []
+    lock = threading.Lock()
+
+    def job():
+        with lock:
+            lags.append((datetime.now() - target).total_seconds())
+    for _ in range(count):
+        scheduler.add_job(job, 'date', run_date=target, misfire_grace_time=None)
+    while len(lags) < count and datetime.now() < target + timedelta(seconds=120):
+        time.sleep(0.1)
+    scheduler.shutdown(wait=False)
+    return max(lags) if lags else float("nan"), len(lags)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--apscheduler-entries", type=int, default=20000)
+    parser.add_argument("--drift", action="store_true")
+    args = parser.parse_args()
+    start = datetime.now().replace(second=0, microsecond=0)
+
+    rate, per_entry, tick_p50, tick_max = bench_wheel(args.entries, start)
+    print(f"timing wheel, {args.entries} pending: {rate:.0f} schedules/s, "
+          f"{per_entry:.0f} bytes/reminder, tick p50 {tick_p50:.0f} us, max {tick_max:.0f} us")
+
+    rate, per_entry = bench_apscheduler(args.apscheduler_entries, start)
+    print(f"APScheduler, {args.apscheduler_entries} pending: {rate:.0f} schedules/s, "
+          f"{per_entry:.0f} bytes/reminder")
+
+    if args.drift:
+        lag, fired = drift_wheel(1000, args.entries)
+        print(f"timing wheel drift, {args.entries} pending: {fired} reminders handed over {lag:.2f}s after their minute")
+        lag, fired = drift_apscheduler(1000)
+        print(f"APScheduler drift: last of {fired} jobs ran {lag:.2f}s after its run_date")
+
+if __name__ == "__main__":
+    main()
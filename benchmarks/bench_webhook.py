@@ -0,0 +1,88 @@
+"""Startup time and requests per second of the / webhook using the Flask test client.
+
+Usage: python benchmarks/bench_webhook.py [--requests 5000] [--startups 5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+def startup_seconds(statement, env, runs):
+    timings = []
+    for _ in range(runs):
+        begin = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], cwd=ROOT, env=env, check=True, capture_output=True)
+        timings.append(time.perf_counter() - begin)
+    return statistics.median(timings)
+
+def requests_per_second(client, messages, count):
+    begin = time.perf_counter()
+    for i in range(count):
+        for body in messages:
+            client.post("/", data={"Body": body, "From": f"whatsapp:+{i}"})
+    return count * len(messages) / (time.perf_counter() - begin)
+
+def render_comparison(rounds=20000):
+    import twiml
+    try:
+        from twilio.twiml.messaging_response import MessagingResponse
+    except ImportError:
+        return None
+    text = "⏰ What time would you like to be reminded? (e.g., 14:30 or 2:30)"
+    begin = time.perf_counter()
+    for _ in range(rounds):
+        response = MessagingResponse()
+        response.message(text)
+        str(response)
+    tree = (time.perf_counter() - begin) / rounds * 1e6
+    begin = time.perf_counter()
+    for _ in range(rounds):
+        twiml.render_message(text)
+    rendered = (time.perf_counter() - begin) / rounds * 1e6
+    return tree, rendered
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--startups", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_PATH=os.path.join(tmp, "bench.db"))
+        os.environ.update(env)
+
+        python = startup_seconds("pass", env, args.startups)
+        app_import = startup_seconds("import app", env, args.startups)
+        print(f"interpreter start: {python * 1000:.0f} ms, import app: {(app_import - python) * 1000:.0f} ms")
+        heavy = startup_seconds(
+            "import twilio.rest, twilio.twiml.messaging_response, apscheduler.schedulers.background, requests",
+            env, args.startups
+        )
+        print(f"modules no longer imported at startup: {(heavy - python) * 1000:.0f} ms")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app
+        client = app.app.test_client()
+        scenarios = [
+            ("welcome", ["hi"]),
+            ("remind + cancel", ["remind", "cancel"]),
+            ("date/time steps", ["remind", "26 Aug 2030", "14:30", "cancel"]),
+        ]
+        for name, messages in scenarios:
+            rate = requests_per_second(client, messages, args.requests // len(messages))
+            print(f"{name:>16}: {rate:>8.0f} requests/s")
+
+    comparison = render_comparison()
+    if comparison:
+        print(f"MessagingResponse render: {comparison[0]:.1f} us, pre-rendered TwiML: {comparison[1]:.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Replays bursts of duplicate Twilio webhooks and checks reminders are scheduled once.
+
+Every user walks through the remind -> date -> time -> message dialogue and
+then sends a "remind me at" message. Each webhook is delivered several
+times concurrently with the same MessageSid, as Twilio does when the app
+answers slowly. The run is repeated without deduplication, with the
+in-memory layer and with the shared SQLite table.
+
+Usage: python benchmarks/bench_webhook_dedupe.py [--users 200] [--duplicates 5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# One consecutive-reminder event three or more days out schedules three reminders, plus one quick reminder
+REMINDERS_PER_USER = 4
+
+class NoDedupe:
+    def run_once(self, message_sid, handler):
+        return handler()
+
+def run(app, database, dedupe, users, duplicates):
+    app.webhook_dedupe = dedupe
+    local = threading.local()
+
+    def post(user, step, body):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.app.test_client()
+        client.post("/", data={"Body": body, "From": f"whatsapp:+{user}", "MessageSid": f"SM{user:08d}{step}"})
+
+    steps = ["remind", "26 Dec 2030", "14:30", "dentist", "remind me at 23:59 stretch"]
+    run_id = time.monotonic_ns()
+    users = range(run_id % 10**6 * 1000, run_id % 10**6 * 1000 + users)
+    conn = database.get_connection()
+    before = conn.execute("SELECT COUNT(*) FROM reminders").fetchone()[0]
+
+    begin = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        for step, body in enumerate(steps):
+            # Every copy of every user's message for this step arrives at once
+            futures = [pool.submit(post, user, step, body) for user in users for _ in range(duplicates)]
+            for future in futures:
+                future.result()
+    elapsed = time.perf_counter() - begin
+
+    scheduled = conn.execute("SELECT COUNT(*) FROM reminders").fetchone()[0] - before
+    return scheduled, len(users) * REMINDERS_PER_USER, len(users) * len(steps) * duplicates / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--duplicates", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the dispatcher from sending anything while the test runs
+        os.environ.update(DATABASE_PATH=os.path.join(tmp, "bench.db"), DISPATCH_POLL_INTERVAL="3600")
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app
+        import database
+        import idempotency
+
+        failed = False
+        for name, dedupe in [
+            ("no dedupe", NoDedupe()),
+            ("memory", idempotency.MemoryDedupe()),
+            ("sqlite", idempotency.SQLiteDedupe()),
+        ]:
+            scheduled, expected, rate = run(app, database, dedupe, args.users, args.duplicates)
+            ok = scheduled == expected
+            if name != "no dedupe":
+                failed = failed or not ok
+            print(f"{name:>10}: {scheduled} reminders scheduled, expected {expected} "
+                  f"({'ok' if ok else 'DUPLICATES'}), {rate:.0f} webhooks/s")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
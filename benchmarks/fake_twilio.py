@@ -0,0 +1,82 @@
+"""Local stand-in for the Twilio Messages API with injectable latency and 429s.
+
+Usage: python benchmarks/fake_twilio.py [--port 8089] [--latency 0.05] [--rate-limit-ratio 0.1]
+Then point the app at it with TWILIO_API_BASE=http://127.0.0.1:8089
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+class FakeTwilioServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, rate_limit_ratio=0.0):
+        super().__init__(address, FakeTwilioHandler)
+        self.latency = latency
+        self.rate_limit_ratio = rate_limit_ratio
+        self.sids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.received = []
+        self.rejected = 0
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+class FakeTwilioHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        if server.latency:
+            time.sleep(server.latency)
+
+        if random.random() < server.rate_limit_ratio:
+            with server.lock:
+                server.rejected += 1
+            self._reply(429, {"code": 20429, "message": "Too Many Requests"}, {"Retry-After": "0"})
+            return
+
+        sid = f"SM{next(server.sids):032d}"
+        with server.lock:
+            server.received.append((form.get("To", [""])[0], form.get("Body", [""])[0]))
+        self._reply(201, {"sid": sid, "status": "queued"})
+
+    def _reply(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeTwilioServer(("127.0.0.1", args.port), args.latency, args.rate_limit_ratio)
+    print(f"Fake Twilio listening on {server.base_url}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,52 @@
+import os
 import sqlite3
+import threading
+from datetime import datetime, timedelta
 
-def create_database():
+import recurrence
+
+DEFAULT_DATABASE = 'whatsapp_reminder.db'
+
+# Reminder times are stored as text in this format so that the
+# (is_sent, reminder_time) index can be range-scanned in time order
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Stay well below SQLite's limit on bound parameters per statement
+SQL_BATCH = 500
+
+_local = threading.local()
+
+def get_database_path():
+    return os.environ.get("DATABASE_PATH", DEFAULT_DATABASE)
+
+def connect(path=None):
+    """Open a new connection configured for concurrent readers and a single writer"""
+    conn = sqlite3.connect(path or get_database_path(), timeout=30)
+    # WAL lets the dispatcher read due reminders while webhooks insert new ones
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+def get_connection(path=None):
+    """Return this thread's cached connection to the reminder database"""
+    path = path or get_database_path()
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = connections[path] = connect(path)
+    return conn
+
+def create_database(path=None):
     # This will create a database file named 'whatsapp_reminder.db'
-    conn = sqlite3.connect('whatsapp_reminder.db')
+    conn = connect(path)
     cursor = conn.cursor()
 
+    # Several workers may start at once; the write lock makes each column check and ALTER atomic
+    cursor.execute("BEGIN IMMEDIATE")
+
     # Create the users table
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS users (
@@ -23,15 +65,222 @@ def create_database():
         reminder_time DATETIME NOT NULL,
         is_sent INTEGER DEFAULT 0,
         created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        lease_owner TEXT,
+        lease_expires DATETIME,
+        recurrence TEXT,
         FOREIGN KEY (user_id) REFERENCES users (id)
     );
     ''')
 
+    # Databases created before leases existed need the lease columns added
+    add_column_if_missing(cursor, 'reminders', 'lease_owner', 'TEXT')
+    add_column_if_missing(cursor, 'reminders', 'lease_expires', 'DATETIME')
+    add_column_if_missing(cursor, 'reminders', 'recurrence', 'TEXT')
+
+    # The dispatcher only ever looks for unsent reminders that are due
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_reminders_due
+    ON reminders (is_sent, reminder_time);
+    ''')
+
+    # Listing a user's reminders only needs the pending ones, so the index skips sent rows
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_reminders_user
+    ON reminders (user_id, reminder_time) WHERE is_sent = 0;
+    ''')
+
     print("Database and tables created successfully!")
 
     # Commit the changes and close the connection
     conn.commit()
     conn.close()
 
-if _name_ == '_main_':
+def add_column_if_missing(cursor, table, column, declaration):
+    """Add a column to a table created by an older version; call inside a BEGIN IMMEDIATE transaction"""
+    columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+def get_user_id(whatsapp_id, conn):
+    """Look up the user row for a WhatsApp number, creating it if needed"""
+    row = conn.execute(
+        "SELECT id FROM users WHERE whatsapp_id = ?", (whatsapp_id,)
+    ).fetchone()
+    if row:
+        return row[0]
+    # Another worker may be adding the same user concurrently
+    conn.execute("INSERT OR IGNORE INTO users (whatsapp_id) VALUES (?)", (whatsapp_id,))
+    return conn.execute(
+        "SELECT id FROM users WHERE whatsapp_id = ?", (whatsapp_id,)
+    ).fetchone()[0]
+
+def insert_reminders(whatsapp_id, reminders, conn):
+    """Insert (message, reminder_time) pairs for one user inside the caller's transaction"""
+    user_id = get_user_id(whatsapp_id, conn)
+    ids = []
+    for message, reminder_time in reminders:
+        cursor = conn.execute(
+            "INSERT INTO reminders (user_id, message, reminder_time) VALUES (?, ?, ?)",
+            (user_id, message, reminder_time.strftime(TIME_FORMAT))
+        )
+        ids.append(cursor.lastrowid)
+    return ids
+
+def add_reminders(whatsapp_id, reminders, conn=None):
+    """Store (message, reminder_time) pairs for one user in a single transaction"""
+    conn = conn or get_connection()
+    with conn:
+        return insert_reminders(whatsapp_id, reminders, conn)
+
+def add_reminder(whatsapp_id, message, reminder_time, conn=None):
+    return add_reminders(whatsapp_id, [(message, reminder_time)], conn)[0]
+
+def insert_recurring_reminder(whatsapp_id, message, rule, first_time, conn):
+    """Insert a repeating reminder inside the caller's transaction"""
+    user_id = get_user_id(whatsapp_id, conn)
+    return conn.execute(
+        "INSERT INTO reminders (user_id, message, reminder_time, recurrence) VALUES (?, ?, ?, ?)",
+        (user_id, message, first_time.strftime(TIME_FORMAT), rule.encode())
+    ).lastrowid
+
+def add_recurring_reminder(whatsapp_id, message, rule, first_time, conn=None):
+    """Store a repeating reminder as a single row holding its rule and next occurrence"""
+    conn = conn or get_connection()
+    with conn:
+        return insert_recurring_reminder(whatsapp_id, message, rule, first_time, conn)
+
+def claim_due_reminders(worker_id, now, limit=500, lease_seconds=300, shard=0, shard_count=1, steal_after=60, conn=None):
+    """Lease up to `limit` due reminders to `worker_id` and return them, oldest first
+
+    Reminders whose lease has expired are claimable again, so a dead worker's
+    batch is picked up by another one. With `shard_count` > 1 a worker only
+    claims its own users' reminders until they are `steal_after` seconds overdue.
+    """
+    conn = conn or get_connection()
+    now_text = now.strftime(TIME_FORMAT)
+    expires = (now + timedelta(seconds=lease_seconds)).strftime(TIME_FORMAT)
+    steal_before = (now - timedelta(seconds=steal_after)).strftime(TIME_FORMAT)
+
+    # BEGIN IMMEDIATE takes the write lock before reading, so two workers can never claim the same rows
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute('''
+            SELECT r.id, u.whatsapp_id, r.message, r.reminder_time
+            FROM reminders r JOIN users u ON u.id = r.user_id
+            WHERE r.is_sent = 0 AND r.reminder_time <= ?
+              AND (r.lease_expires IS NULL OR r.lease_expires <= ?)
+              AND (? = 1 OR r.user_id % ? = ? OR r.reminder_time <= ?)
+            ORDER BY r.reminder_time
+            LIMIT ?
+        ''', (now_text, now_text, shard_count, shard_count, shard, steal_before, limit)).fetchall()
+        conn.executemany(
+            "UPDATE reminders SET lease_owner = ?, lease_expires = ? WHERE id = ?",
+            [(worker_id, expires, row[0]) for row in rows]
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return rows
+
+def mark_sent(reminder_ids, worker_id=None, now=None, conn=None):
+    """Mark reminders sent, skipping any whose lease has since passed to another worker
+
+    Recurring reminders are moved on to their next occurrence instead, and
+    only marked sent once their rule has ended.
+    """
+    conn = conn or get_connection()
+    with conn:
+        if worker_id is None:
+            conn.executemany(
+                "UPDATE reminders SET is_sent = 1 WHERE id = ? AND recurrence IS NULL",
+                [(reminder_id,) for reminder_id in reminder_ids]
+            )
+        else:
+            conn.executemany(
+                "UPDATE reminders SET is_sent = 1, lease_expires = NULL WHERE id = ? AND lease_owner = ? AND recurrence IS NULL",
+                [(reminder_id, worker_id) for reminder_id in reminder_ids]
+            )
+        advance_recurring(reminder_ids, worker_id, now or datetime.now(), conn)
+
+def advance_recurring(reminder_ids, worker_id, now, conn):
+    """Reschedule the recurring reminders among `reminder_ids` that have just fired"""
+    updates = []
+    for start in range(0, len(reminder_ids), SQL_BATCH):
+        chunk = reminder_ids[start:start + SQL_BATCH]
+        rows = conn.execute(f'''
+            SELECT id, reminder_time, recurrence FROM reminders
+            WHERE id IN ({", ".join("?" * len(chunk))})
+              AND recurrence IS NOT NULL
+              AND (? IS NULL OR lease_owner = ?)
+        ''', (*chunk, worker_id, worker_id)).fetchall()
+        for reminder_id, reminder_time, rule in rows:
+            next_time = recurrence.RecurrenceRule.decode(rule).next_occurrence(
+                datetime.fromisoformat(reminder_time), now
+            )
+            updates.append((
+                next_time.strftime(TIME_FORMAT) if next_time else reminder_time,
+                0 if next_time else 1,
+                reminder_id
+            ))
+    conn.executemany(
+        "UPDATE reminders SET reminder_time = ?, is_sent = ?, lease_owner = NULL, lease_expires = NULL WHERE id = ?",
+        updates
+    )
+
+def list_reminders(whatsapp_id, after=None, limit=10, conn=None):
+    """Return up to `limit` of a user's pending reminders in time order
+
+    `after` is the (reminder_time, id) of the last row of the previous page,
+    so every page is an index range scan however many reminders came before.
+    """
+    conn = conn or get_connection()
+    after_time, after_id = after or ('', 0)
+    return conn.execute('''
+        SELECT r.id, r.message, r.reminder_time, r.recurrence
+        FROM reminders r
+        WHERE r.user_id = (SELECT id FROM users WHERE whatsapp_id = ?)
+          AND r.is_sent = 0
+          AND r.reminder_time >= ?
+          AND (r.reminder_time > ? OR r.id > ?)
+        ORDER BY r.reminder_time, r.id
+        LIMIT ?
+    ''', (whatsapp_id, after_time, after_time, after_id, limit)).fetchall()
+
+def cancel_reminder(whatsapp_id, reminder_id, conn=None):
+    """Delete one of a user's pending reminders, returning whether it existed"""
+    conn = conn or get_connection()
+    with conn:
+        return conn.execute('''
+            DELETE FROM reminders
+            WHERE id = ? AND is_sent = 0
+              AND user_id = (SELECT id FROM users WHERE whatsapp_id = ?)
+        ''', (reminder_id, whatsapp_id)).rowcount == 1
+
+def snooze_reminder(whatsapp_id, reminder_id, minutes, now, conn=None):
+    """Push a user's reminder `minutes` later, or `minutes` from now if it is already due or sent
+
+    Returns the new reminder time, or None if the user has no such reminder.
+    """
+    conn = conn or get_connection()
+    with conn:
+        row = conn.execute('''
+            SELECT reminder_time FROM reminders
+            WHERE id = ? AND user_id = (SELECT id FROM users WHERE whatsapp_id = ?)
+        ''', (reminder_id, whatsapp_id)).fetchone()
+        if row is None:
+            return None
+        reminder_time = max(datetime.fromisoformat(row[0]), now) + timedelta(minutes=minutes)
+        conn.execute('''
+            UPDATE reminders
+            SET reminder_time = ?, is_sent = 0, lease_owner = NULL, lease_expires = NULL
+            WHERE id = ?
+        ''', (reminder_time.strftime(TIME_FORMAT), reminder_id))
+    return reminder_time
+
+def count_pending(conn=None):
+    conn = conn or get_connection()
+    return conn.execute("SELECT COUNT(*) FROM reminders WHERE is_sent = 0").fetchone()[0]
+
+if __name__ == '__main__':
     create_database()
@@ -0,0 +1,93 @@
+import re
+from datetime import date
+from functools import lru_cache
+
+# Month names are recognised by their first three letters, so "aug",
+# "august" and "augustus" all resolve to 8
+MONTH_PREFIXES = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+# A message that is nothing but a date is matched in a single pass
+DATE_GRAMMAR = re.compile(r'''
+    (?P<num_day>\d{1,2})[/-](?P<num_month>\d{1,2})(?:[/-](?P<num_year>\d{4}))?   # 26/08/2025, 26-08
+  | (?P<day>\d{1,2})\s+(?P<month>[a-z]+)(?:\s+(?P<year>\d{4}))?                  # 26 aug 2025, 26 aug
+  | (?P<name>[a-z]+)\s+(?P<name_day>\d{1,2})(?:\s+(?P<name_year>\d{4}))?         # aug 26 2025, aug 26
+''', re.VERBOSE)
+
+# Dates embedded in other text are searched for in order of preference
+# Numbers must not run into other digits, so "may 2025" is not 20 May
+SEARCH_PATTERNS = [
+    (re.compile(r'(?<!\d)(\d{4})-(\d{1,2})-(\d{1,2})(?!\d)'), 'ymd'),                # 2025-08-26
+    (re.compile(r'(?<!\d)(\d{1,2})[/-](\d{1,2})[/-](\d{4})(?!\d)'), 'dmy'),          # 26/08/2025
+    (re.compile(r'(?<!\d)(\d{1,2})[/-](\d{1,2})(?!\d)'), 'dm'),                      # 26/08
+    (re.compile(r'(?<!\d)(\d{1,2})\s+([a-z]+)\s+(\d{4})(?!\d)'), 'dny'),             # 26 Aug 2025
+    (re.compile(r'(?<!\d)(\d{1,2})\s+([a-z]+)'), 'dn'),                               # 26 Aug
+    (re.compile(r'([a-z]+)\s+(\d{1,2})\s+(\d{4})(?!\d)'), 'ndy'),                    # Aug 26 2025
+    (re.compile(r'([a-z]+)\s+(\d{1,2})(?!\d)'), 'nd'),                                # Aug 26
+]
+
+TIME_PATTERN = re.compile(r'^(\d{1,2})[:h](\d{2})$')
+
+def get_month_number(month_name):
+    """Convert month name to month number"""
+    return MONTH_PREFIXES.get(month_name[:3].lower())
+
+def _make_date(year, month, day):
+    if month is None:
+        return None
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+def _from_grammar(match, current_year):
+    groups = match.groupdict()
+    if groups['num_day']:
+        return _make_date(int(groups['num_year'] or current_year), int(groups['num_month']), int(groups['num_day']))
+    if groups['day']:
+        return _make_date(int(groups['year'] or current_year), get_month_number(groups['month']), int(groups['day']))
+    return _make_date(int(groups['name_year'] or current_year), get_month_number(groups['name']), int(groups['name_day']))
+
+def _search(text, current_year):
+    for pattern, layout in SEARCH_PATTERNS:
+        match = pattern.search(text)
+        if not match:
+            continue
+        groups = match.groups()
+        if layout == 'ymd':
+            result = _make_date(int(groups[0]), int(groups[1]), int(groups[2]))
+            if result:
+                return result
+            continue
+        if layout[0] == 'd':
+            day = int(groups[0])
+            month = int(groups[1]) if layout[1] == 'm' else get_month_number(groups[1])
+        else:
+            month, day = get_month_number(groups[0]), int(groups[1])
+        year = int(groups[2]) if len(groups) == 3 else current_year
+        result = _make_date(year, month, day)
+        if result:
+            return result
+    return None
+
+@lru_cache(maxsize=4096)
+def _parse_normalized(text, current_year):
+    match = DATE_GRAMMAR.fullmatch(text)
+    if match:
+        result = _from_grammar(match, current_year)
+        if result:
+            return result
+    return _search(text, current_year)
+
+def parse_date(date_str, current_year=None):
+    """Parse a date from various formats, returning a datetime.date or None"""
+    return _parse_normalized(date_str.strip().lower(), current_year or date.today().year)
+
+def parse_time(time_str):
+    """Parse HH:MM or HHhMM into an (hour, minute) pair without range checking"""
+    match = TIME_PATTERN.match(time_str)
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
@@ -0,0 +1,294 @@
+import queue
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import metrics
+
+TWILIO_API_BASE = "https://api.twilio.com"
+
+# Responses worth retrying: rate limited or a temporary problem on Twilio's side
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class SendError(Exception):
+    pass
+
+class TransientSendError(SendError):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+# Outcomes passed to DeliveryPipeline's on_result
+SENT = "sent"
+# Rejected by Twilio with a permanent error; sending again would not help
+FAILED = "failed"
+# Still failing after every retry, or failed unexpectedly; worth trying again later
+DEFERRED = "deferred"
+
+class TokenBucket:
+    """Blocking token bucket allowing `rate` acquisitions per second with bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class TwilioSender:
+    """Sends WhatsApp messages through the Twilio REST API over pooled keep-alive connections"""
+
+    def __init__(self, account_sid, auth_token, from_number, base_url=TWILIO_API_BASE, pool_size=10, timeout=10):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.url = f"{base_url.rstrip('/')}/2010-04-01/Accounts/{account_sid}/Messages.json"
+        self.session = None
+        self.lock = threading.Lock()
+
+    def get_session(self):
+        # requests is only imported on the first send so web workers boot without it
+        with self.lock:
+            if self.session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                session.auth = (self.account_sid, self.auth_token)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.session = session
+            return self.session
+
+    def send(self, to, body):
+        import requests
+
+        session = self.session or self.get_session()
+        try:
+            response = session.post(
+                self.url,
+                data={"From": self.from_number, "To": to, "Body": body},
+                timeout=self.timeout
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise TransientSendError(str(e))
+
+        if response.status_code in RETRYABLE_STATUS:
+            retry_after = response.headers.get("Retry-After")
+            raise TransientSendError(
+                f"HTTP {response.status_code}",
+                float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        if response.status_code >= 400:
+            raise SendError(f"HTTP {response.status_code}: {response.text[:200]}")
+        return response.json().get("sid")
+
+class DeliveryPipeline:
+    """Bounded queue of outgoing reminders drained by a fixed pool of sender threads"""
+
+    def __init__(self, sender, workers=8, queue_size=10000, rate=80, max_retries=4, base_delay=0.5, max_delay=30,
+                 on_result=None):
+        self.sender = sender
+        # Called with (reminder, outcome) once a reminder is sent or given up on
+        self.on_result = on_result
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.bucket = TokenBucket(rate)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.threads = []
+        self.stats = {"sent": 0, "failed": 0, "deferred": 0, "retried": 0}
+        self.stats_lock = threading.Lock()
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"delivery-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def submit(self, reminder, timeout=None):
+        """Queue a reminder for delivery, blocking while the queue is full"""
+        self.queue.put(reminder, timeout=timeout)
+
+    def join(self):
+        """Wait until every queued reminder has been delivered or given up on"""
+        self.queue.join()
+
+    def _count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def _backoff(self, attempt, retry_after=None):
+        # Full jitter keeps retries from a burst of 429s from arriving together again
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _run(self):
+        while True:
+            reminder = self.queue.get()
+            try:
+                outcome = self.deliver(reminder)
+                if self.on_result:
+                    self.on_result(reminder, outcome)
+            except Exception as e:
+                print(f"Error finishing delivery: {e}")
+            finally:
+                self.queue.task_done()
+
+    def deliver(self, reminder):
+        """Send one reminder with retries and return SENT, FAILED or DEFERRED"""
+        body = reminder.get("body") or f"⏰ Reminder: {reminder['msg']}"
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            started = time.perf_counter()
+            try:
+                self.sender.send(reminder["to"], body)
+                metrics.SEND_LATENCY.observe(time.perf_counter() - started)
+                metrics.SENDS.labels("ok").inc()
+                if "due" in reminder:
+                    metrics.FIRING_LAG.observe((datetime.now() - reminder["due"]).total_seconds())
+                self._count("sent")
+                print(f"Sent reminder to {reminder['to']}: {reminder['msg']}")
+                return SENT
+            except TransientSendError as e:
+                metrics.SEND_LATENCY.observe(time.perf_counter() - started)
+                metrics.SENDS.labels("transient_error").inc()
+                if attempt == self.max_retries:
+                    error, outcome = e, DEFERRED
+                    break
+                self._count("retried")
+                time.sleep(self._backoff(attempt, e.retry_after))
+            except Exception as e:
+                metrics.SEND_LATENCY.observe(time.perf_counter() - started)
+                metrics.SENDS.labels("error").inc()
+                # Only Twilio's own 4xx rejections are final
+                error, outcome = e, FAILED if isinstance(e, SendError) else DEFERRED
+                break
+        self._count(outcome)
+        print(f"Failed to send reminder ({outcome}):", error)
+        return outcome
+
+# Twilio rejects WhatsApp message bodies longer than this
+MAX_BODY_LENGTH = 1600
+
+class Coalescer:
+    """Holds reminders for `window` seconds and sends each recipient's reminders as one digest
+
+    Digests longer than `max_length` are split over as few messages as
+    possible. A recipient with a single reminder in the window gets it
+    unchanged. At most `max_pending` reminders are held or being handed on
+    at once; `submit` blocks beyond that, and while `send` blocks on a full
+    delivery queue, so a peak cannot pile up more claimed reminders than
+    can be sent before their leases expire.
+    """
+
+    def __init__(self, send, window=60, max_length=MAX_BODY_LENGTH, max_pending=1000):
+        self.send = send
+        self.window = window
+        self.max_length = max_length
+        self.max_pending = max_pending
+        self.pending = {}
+        self.held = 0
+        self.deadlines = deque()
+        self.condition = threading.Condition()
+        self.stats = {"reminders": 0, "messages": 0, "saved": 0}
+
+    def start(self):
+        threading.Thread(target=self._run, name="delivery-coalescer", daemon=True).start()
+        return self
+
+    def submit(self, reminder):
+        """Hold a reminder for its recipient's digest, blocking while max_pending reminders are held"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.held < self.max_pending)
+            self.held += 1
+            self.stats["reminders"] += 1
+            group = self.pending.get(reminder["to"])
+            if group is None:
+                self.pending[reminder["to"]] = [reminder]
+                self.deadlines.append((time.monotonic() + self.window, reminder["to"]))
+                # Submitters waiting for room share this condition, so wake everyone
+                self.condition.notify_all()
+            else:
+                group.append(reminder)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.deadlines or self.deadlines[0][0] > time.monotonic():
+                    timeout = self.deadlines[0][0] - time.monotonic() if self.deadlines else None
+                    self.condition.wait(timeout)
+                ready = []
+                # Windows open in submission order, so due recipients are at the front
+                while self.deadlines and self.deadlines[0][0] <= time.monotonic():
+                    _, to = self.deadlines.popleft()
+                    ready.append(self.pending.pop(to))
+            for group in ready:
+                try:
+                    for message in self.digest(group):
+                        self.send(message)
+                finally:
+                    # Only counted as gone once `send` has taken it, which blocks while the delivery queue is full
+                    with self.condition:
+                        self.held -= len(group)
+                        self.condition.notify_all()
+
+    def digest(self, group):
+        """Combine one recipient's reminders into as few messages as fit within max_length"""
+        if len(group) == 1:
+            messages = group
+        else:
+            messages = []
+            header = "⏰ Reminders:"
+            lines, ids, chunk = [], [], []
+            length = len(header)
+            for reminder in group:
+                line = f"• {reminder['msg']}"
+                if lines and length + 1 + len(line) > self.max_length:
+                    messages.append(self._digest_message(chunk, header, lines, ids))
+                    lines, ids, chunk = [], [], []
+                    length = len(header)
+                lines.append(line)
+                chunk.append(reminder)
+                ids.extend(reminder.get("ids") or ([reminder["id"]] if "id" in reminder else []))
+                length += 1 + len(line)
+            messages.append(self._digest_message(chunk, header, lines, ids))
+
+        with self.condition:
+            self.stats["messages"] += len(messages)
+            self.stats["saved"] += len(group) - len(messages)
+        return messages
+
+    def _digest_message(self, chunk, header, lines, ids):
+        message = {"to": chunk[0]["to"], "ids": ids}
+        dues = [reminder["due"] for reminder in chunk if "due" in reminder]
+        if dues:
+            message["due"] = min(dues)
+        if len(lines) == 1:
+            # A lone overflow line reads better as an ordinary reminder
+            message["msg"] = lines[0][2:]
+        else:
+            message["msg"] = "; ".join(line[2:] for line in lines)
+            message["body"] = "\n".join([header] + lines)
+        return message
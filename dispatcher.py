@@ -0,0 +1,94 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+import database
+import delivery
+
+POLL_INTERVAL = 5
+BATCH_SIZE = 500
+# Must comfortably exceed the time a claimed batch can spend queued and being sent
+LEASE_SECONDS = 300
+
+def make_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class Dispatcher:
+    """Claims leased batches of due reminders from the shared store and sends them
+
+    Any number of processes, on one machine or several sharing the database,
+    can run a dispatcher. Each reminder is leased to one worker at a time and
+    marked sent by that worker once delivery finishes; reminders leased by a
+    worker that dies become claimable again when the lease expires.
+    """
+
+    def __init__(self, send, worker_id=None, interval=POLL_INTERVAL, batch_size=BATCH_SIZE,
+                 lease_seconds=LEASE_SECONDS, shard=0, shard_count=1):
+        self.send = send
+        self.worker_id = worker_id or make_worker_id()
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.shard = shard
+        self.shard_count = shard_count
+        self.finished = deque()
+
+    def delivered(self, reminder, outcome=delivery.SENT):
+        """Record that a claimed reminder is done; called from the delivery threads
+
+        Reminders deferred after a transient failure are left leased, so they
+        are claimed and sent again once the lease expires.
+        """
+        if outcome == delivery.DEFERRED:
+            return
+        if "id" in reminder:
+            self.finished.append(reminder["id"])
+        # Coalesced digests carry the ids of every reminder they combine
+        self.finished.extend(reminder.get("ids", ()))
+
+    def flush(self):
+        ids = []
+        while self.finished:
+            ids.append(self.finished.popleft())
+        if ids:
+            database.mark_sent(ids, self.worker_id)
+        return len(ids)
+
+    def dispatch_due_reminders(self, now=None):
+        """Claim one batch of due reminders and hand them to `send`, returning the batch size"""
+        rows = database.claim_due_reminders(
+            self.worker_id,
+            now or datetime.now(),
+            self.batch_size,
+            self.lease_seconds,
+            self.shard,
+            self.shard_count
+        )
+        for reminder_id, to_number, message, reminder_time in rows:
+            self.send({
+                "id": reminder_id,
+                "to": to_number,
+                "msg": message,
+                "due": datetime.fromisoformat(reminder_time)
+            })
+        return len(rows)
+
+    def run(self):
+        while True:
+            try:
+                self.flush()
+                # Keep draining while batches come back full, otherwise wait for the next poll
+                if self.dispatch_due_reminders() == self.batch_size:
+                    continue
+            except Exception as e:
+                print(f"Error dispatching reminders: {e}")
+            time.sleep(self.interval)
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name="reminder-dispatcher", daemon=True)
+        thread.start()
+        return thread
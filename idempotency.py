@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+
+import database
+
+# Sent back to a duplicate delivery whose original is still being handled; the original carries the reply
+EMPTY_RESPONSE = b'<?xml version="1.0" encoding="UTF-8"?><Response />'
+
+class _Pending:
+    __slots__ = ('done', 'response')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+
+class MemoryDedupe:
+    """Runs each webhook delivery once per MessageSid and replays its response to retries
+
+    Keeps an LRU of recent MessageSids with a TTL. Only deduplicates within
+    one process; use SQLiteDedupe when several workers receive webhooks.
+    """
+
+    def __init__(self, ttl=3600, max_entries=100000, wait_timeout=10):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def run_once(self, message_sid, handler):
+        if not message_sid:
+            return handler()
+
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(message_sid)
+            if entry is not None and now - entry[0] > self.ttl:
+                entry = None
+            if entry is None:
+                pending = _Pending()
+                self.entries[message_sid] = (now, pending)
+                self.entries.move_to_end(message_sid)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+            else:
+                pending = None
+
+        if pending is None:
+            # A retry: wait for the first delivery to finish if it is still running
+            first = entry[1]
+            first.done.wait(self.wait_timeout)
+            return first.response or EMPTY_RESPONSE
+
+        try:
+            pending.response = handler()
+            return pending.response
+        except Exception:
+            # Let a retry try again rather than replaying nothing
+            with self.lock:
+                self.entries.pop(message_sid, None)
+            raise
+        finally:
+            pending.done.set()
+
+class SQLiteDedupe:
+    """MessageSid deduplication shared by every worker through the reminder database"""
+
+    # Entries older than the TTL are purged once every this many deliveries
+    PURGE_EVERY = 1000
+
+    def __init__(self, ttl=3600, wait_timeout=10, path=None):
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.path = path
+        self.deliveries = 0
+        conn = database.get_connection(path)
+        with conn:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS webhook_responses (
+                message_sid TEXT PRIMARY KEY,
+                response BLOB,
+                received REAL NOT NULL
+            ) WITHOUT ROWID;
+            ''')
+
+    def run_once(self, message_sid, handler):
+        if not message_sid:
+            return handler()
+
+        conn = database.get_connection(self.path)
+        now = time.time()
+        with conn:
+            conn.execute(
+                "DELETE FROM webhook_responses WHERE message_sid = ? AND received <= ?",
+                (message_sid, now - self.ttl)
+            )
+            claimed = conn.execute(
+                "INSERT OR IGNORE INTO webhook_responses (message_sid, response, received) VALUES (?, NULL, ?)",
+                (message_sid, now)
+            ).rowcount == 1
+
+        if not claimed:
+            return self._wait_for_response(conn, message_sid, handler)
+
+        try:
+            response = handler()
+        except Exception:
+            with conn:
+                conn.execute("DELETE FROM webhook_responses WHERE message_sid = ?", (message_sid,))
+            raise
+        with conn:
+            conn.execute(
+                "UPDATE webhook_responses SET response = ? WHERE message_sid = ?",
+                (response, message_sid)
+            )
+
+        self.deliveries += 1
+        if self.deliveries % self.PURGE_EVERY == 0:
+            self.purge()
+        return response
+
+    def _wait_for_response(self, conn, message_sid, handler):
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            row = conn.execute(
+                "SELECT response FROM webhook_responses WHERE message_sid = ?", (message_sid,)
+            ).fetchone()
+            if row is None:
+                # The first delivery failed and released its claim
+                return self.run_once(message_sid, handler)
+            if row[0] is not None:
+                return bytes(row[0])
+            if time.monotonic() >= deadline:
+                return EMPTY_RESPONSE
+            time.sleep(0.05)
+
+    def purge(self):
+        conn = database.get_connection(self.path)
+        with conn:
+            conn.execute("DELETE FROM webhook_responses WHERE received <= ?", (time.time() - self.ttl,))
+
+def create_dedupe(backend, ttl=3600, max_entries=100000):
+    if backend == "sqlite":
+        return SQLiteDedupe(ttl)
+    return MemoryDedupe(ttl, max_entries)
@@ -0,0 +1,163 @@
+import bisect
+import threading
+import weakref
+
+# Latency buckets in seconds, from sub-millisecond webhook replies to minutes of firing lag
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+REGISTRY = []
+
+class _Values:
+    """A metric's running values, split into one list per thread
+
+    Each thread only ever writes its own list, so updates need no lock. The
+    lists of finished threads are folded into a shared total.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.live = {}
+        self.retired = [0] * size
+
+    def shard(self):
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = self.local.shard = [0] * self.size
+            thread = threading.current_thread()
+            key = id(shard)
+            with self.lock:
+                self.live[key] = shard
+            weakref.finalize(thread, self._retire, key)
+            return shard
+
+    def _retire(self, key):
+        with self.lock:
+            shard = self.live.pop(key, None)
+            if shard:
+                self.retired = [a + b for a, b in zip(self.retired, shard)]
+
+    def totals(self):
+        with self.lock:
+            totals = list(self.retired)
+            for shard in self.live.values():
+                for i, value in enumerate(shard):
+                    totals[i] += value
+        return totals
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.children = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, value):
+        child = self.children.get(value)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(value, self._new_values())
+        return child
+
+    def _series(self):
+        if self.label is None:
+            return [("", self.labels(None))]
+        return [(f'{self.label}="{value}"', child) for value, child in sorted(self.children.items())]
+
+class _CounterValues(_Values):
+    def inc(self, amount=1):
+        self.shard()[0] += amount
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_values(self):
+        return _CounterValues(1)
+
+    def inc(self, amount=1):
+        self.labels(None).inc(amount)
+
+    def render(self):
+        lines = []
+        for labels, child in self._series():
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}{suffix} {child.totals()[0]}")
+        return lines
+
+class _HistogramValues(_Values):
+    def __init__(self, buckets):
+        # One count per bucket, one for +Inf, then the running sum
+        super().__init__(len(buckets) + 2)
+        self.buckets = buckets
+
+    def observe(self, value):
+        shard = self.shard()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, label=None, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        super().__init__(name, help, label)
+
+    def _new_values(self):
+        return _HistogramValues(self.buckets)
+
+    def observe(self, value):
+        self.labels(None).observe(value)
+
+    def render(self):
+        lines = []
+        for labels, child in self._series():
+            totals = child.totals()
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            for bound, count in zip(list(self.buckets) + ["+Inf"], totals[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {totals[-1]}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+class Gauge:
+    """A value read from `collect` each time metrics are scraped"""
+
+    def __init__(self, name, help, collect, kind="gauge"):
+        self.name = name
+        self.help = help
+        self.collect = collect
+        self.kind = kind
+        REGISTRY.append(self)
+
+    def render(self):
+        try:
+            return [f"{self.name} {self.collect()}"]
+        except Exception as e:
+            print(f"Error collecting {self.name}: {e}")
+            return []
+
+def render():
+    """Render every registered metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+WEBHOOK_REQUESTS = Counter("remindme_webhook_requests_total", "Webhook deliveries received, including Twilio retries")
+WEBHOOK_LATENCY = Histogram("remindme_webhook_seconds", "Time to handle a webhook message by conversation state", label="state")
+FIRING_LAG = Histogram("remindme_firing_lag_seconds", "Time between a reminder's scheduled time and its successful send")
+SEND_LATENCY = Histogram("remindme_twilio_send_seconds", "Duration of each Twilio send attempt")
+SENDS = Counter("remindme_twilio_sends_total", "Twilio send attempts by outcome", label="outcome")
+NLU_PARSES = Counter("remindme_nlu_messages_total", "Free-text messages by how they were understood", label="source")
+NLU_MODEL_CALLS = Counter("remindme_nlu_model_calls_total", "Batched calls to the language model backend")
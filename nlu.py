@@ -0,0 +1,403 @@
+import json
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import date_parser
+import metrics
+
+# Leading phrases that only say a reminder is wanted
+REMIND_PREFIX = re.compile(r'^\s*(?:please\s+)?(?:remind\s+me\s+(?:to\s+|about\s+|that\s+)?|reminder:?\s+)', re.IGNORECASE)
+
+# Times the local parser is sure about: 14:30, 2.30pm, at 2.30, 9h15, 5pm, noon.
+# A bare dotted number (12.50, 2.10) is a price or a version, not a time.
+TIME_IN_TEXT = re.compile(r'''
+    \b(?P<at>at\s+)?(?:
+        (?P<hour>\d{1,2})(?P<separator>[:.h])(?P<minute>\d{2})\s*(?P<ampm>[ap]\.?m\b\.?)?
+      | (?P<ampm_hour>\d{1,2})\s*(?P<ampm_only>[ap]\.?m\b\.?)
+      | (?P<named>noon|midnight)
+    )(?![\w:])
+''', re.IGNORECASE | re.VERBOSE)
+
+DAY_IN_TEXT = re.compile(
+    r'\b(?:on\s+|next\s+|this\s+)?(?P<day>today|tonight|tomorrow|monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b',
+    re.IGNORECASE
+)
+DAY_OFFSETS = {'today': 0, 'tonight': 0, 'tomorrow': 1}
+WEEKDAY_NUMBERS = {'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6}
+
+# Candidate dates are confirmed by date_parser: 26/08, 26 Aug 2025, August 26th.
+# A lookahead so candidates can overlap: when "dinner 26" is rejected, "26 Dec" is still tried.
+DATE_IN_TEXT = re.compile(r'''
+    \b(?=(?:on\s+)?(?P<date>
+        \d{1,2}[/-]\d{1,2}(?:[/-]\d{4})?
+      | \d{1,2}(?:st|nd|rd|th)?\s+[a-z]{3,9}(?:\s+\d{4})?
+      | [a-z]{3,9}\s+\d{1,2}(?:st|nd|rd|th)?(?:\s+\d{4})?
+    )\b)
+''', re.IGNORECASE | re.VERBOSE)
+ORDINAL_SUFFIX = re.compile(r'(?<=\d)(?:st|nd|rd|th)\b', re.IGNORECASE)
+
+# Connecting words left at either end of the message once the date and time are cut out
+EDGE_WORDS = re.compile(r'^(?:\s|[,;:.!-]|\b(?:to|on|at|about|by|for)\b)+|(?:\s|[,;:.!-]|\b(?:to|on|at|about|by|for)\b)+$', re.IGNORECASE)
+WHITESPACE = re.compile(r'\s+')
+
+# Only messages with one of these are worth a model call
+REMINDER_HINT = re.compile(r'\d|\bremind|\b(?:today|tonight|tomorrow|morning|afternoon|evening|noon|midnight|minutes?|hours?|later|week|month|[a-z]+day)\b')
+
+MODEL_PROMPT = """Today is {weekday} {today}. Each of the following WhatsApp messages may ask for a reminder.
+Return a JSON array with one entry per message, in the same order. For a message that asks for a
+reminder at a definite time, the entry is an object with "message" (what to be reminded about, in the
+sender's words), "date" ("YYYY-MM-DD", or null for the next time the clock time comes round), "time"
+("HH:MM", 24-hour) and "minutes_from_now" (an integer for relative requests like "in 20 minutes",
+otherwise null). For any other message the entry is null.
+
+Messages:
+{messages}"""
+
+class ModelUnavailable(Exception):
+    """The model backend failed or did not answer in time"""
+
+class Interpretation:
+    """What a free-text message asks for, independent of when it is resolved to a datetime"""
+    __slots__ = ('message', 'date', 'time', 'minutes_from_now')
+
+    def __init__(self, message, date=None, time=None, minutes_from_now=None):
+        self.message = message
+        self.date = date
+        self.time = time
+        self.minutes_from_now = minutes_from_now
+
+    @classmethod
+    def from_dict(cls, item):
+        """Build from a model's JSON object, or return None if it does not describe a usable reminder"""
+        try:
+            message = str(item.get("message") or "").strip()
+            minutes = item.get("minutes_from_now")
+            if minutes is not None:
+                minutes = int(minutes)
+                return cls(message, minutes_from_now=minutes) if message and minutes > 0 else None
+            hour, minute = (int(part) for part in str(item["time"]).split(":"))
+            if not (message and 0 <= hour <= 23 and 0 <= minute <= 59):
+                return None
+            return cls(message, date.fromisoformat(item["date"]) if item.get("date") else None, (hour, minute))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return None
+
+    def resolve(self, now):
+        """The reminder's (message, datetime), or None if it is already in the past"""
+        if self.minutes_from_now is not None:
+            return self.message, now.replace(second=0, microsecond=0) + timedelta(minutes=self.minutes_from_now)
+        hour, minute = self.time
+        when = datetime.combine(self.date or now.date(), datetime.min.time()).replace(hour=hour, minute=minute)
+        if when <= now:
+            if self.date is not None:
+                return None
+            when += timedelta(days=1)
+        return self.message, when
+
+def normalize(text):
+    """Cache key form of a message: lower case, single spaces, no trailing punctuation"""
+    return WHITESPACE.sub(' ', text.lower()).strip().rstrip('.!?').strip()
+
+def _parse_time(match, after_at=False):
+    if match.group('named'):
+        return (12, 0) if match.group('named').lower() == 'noon' else (0, 0)
+    if match.group('hour'):
+        hour, minute, ampm = int(match.group('hour')), int(match.group('minute')), match.group('ampm')
+        if match.group('separator') == '.' and not (ampm or after_at or match.group('at')):
+            return None
+    else:
+        hour, minute, ampm = int(match.group('ampm_hour')), 0, match.group('ampm_only')
+    if ampm:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if ampm[0].lower() == 'p' else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+def parse_clock_time(text):
+    """Read a time given on its own after "at", such as 9am, 14:30 or 9.15, into (hour, minute), or None"""
+    match = TIME_IN_TEXT.fullmatch(text.strip())
+    return _parse_time(match, after_at=True) if match else None
+
+def _find_date(text, now, at):
+    """Return (date, span) for the first day word or calendar date in `text`"""
+    today = now.date()
+    match = DAY_IN_TEXT.search(text)
+    if match:
+        day = match.group('day').lower()
+        if day in DAY_OFFSETS:
+            return today + timedelta(days=DAY_OFFSETS[day]), match.span()
+        # Today's weekday means today unless that time has passed
+        days_ahead = (WEEKDAY_NUMBERS[day] - today.weekday()) % 7
+        if days_ahead == 0 and now.replace(hour=at[0], minute=at[1], second=0, microsecond=0) <= now:
+            days_ahead = 7
+        return today + timedelta(days=days_ahead), match.span()
+    for match in DATE_IN_TEXT.finditer(text):
+        candidate = ORDINAL_SUFFIX.sub('', match.group('date'))
+        parsed = date_parser.parse_date(candidate, today.year)
+        if parsed is None:
+            continue
+        # "5 Jan" sent in December means next January
+        if parsed < today and not re.search(r'\d{4}', candidate):
+            parsed = parsed.replace(year=today.year + 1)
+        return parsed, (match.start(), match.end('date'))
+    return None, None
+
+def parse_local(text, now):
+    """Understand a message with a definite time in it without calling a model
+
+    Returns an Interpretation, or None if the message has no clock time or
+    nothing left to be reminded about.
+    """
+    body = REMIND_PREFIX.sub('', text, count=1)
+    for time_match in TIME_IN_TEXT.finditer(body):
+        parsed_time = _parse_time(time_match)
+        if parsed_time is not None:
+            break
+    else:
+        return None
+    start, end = time_match.span()
+    body = body[:start] + ' ' + body[end:]
+
+    found_date, span = _find_date(body, now, parsed_time)
+    if span:
+        body = body[:span[0]] + ' ' + body[span[1]:]
+
+    message = EDGE_WORDS.sub('', WHITESPACE.sub(' ', body))
+    if not message:
+        return None
+    return Interpretation(message, found_date, parsed_time)
+
+class StubBackend:
+    """Offline stand-in for a language model that answers from a table of known messages
+
+    `responses` maps normalized message text to an Interpretation. `latency`
+    seconds are spent on every call, as a real model would.
+    """
+
+    def __init__(self, responses=None, latency=0.0):
+        self.responses = responses or {}
+        self.latency = latency
+        self.calls = 0
+
+    @classmethod
+    def from_file(cls, path, latency=0.0):
+        """Load tab-separated lines of: message, reminder text, date or empty, HH:MM or +minutes"""
+        responses = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                text, message, day, at = line.rstrip("\n").split("\t")
+                if at.startswith("+"):
+                    item = {"message": message, "minutes_from_now": int(at[1:])}
+                else:
+                    item = {"message": message, "date": day or None, "time": at}
+                responses[normalize(text)] = Interpretation.from_dict(item)
+        return cls(responses, latency)
+
+    def interpret_batch(self, texts, today):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self.responses.get(normalize(text)) for text in texts]
+
+class GeminiBackend:
+    """Interprets a batch of messages with one google-genai request"""
+
+    def __init__(self, api_key=None, model="gemini-2.5-flash"):
+        self.api_key = api_key
+        self.model = model
+        self.client = None
+        self.lock = threading.Lock()
+
+    def get_client(self):
+        # google-genai is only imported once the model is actually needed
+        if self.client is None:
+            with self.lock:
+                if self.client is None:
+                    from google import genai
+                    self.client = genai.Client(api_key=self.api_key)
+        return self.client
+
+    def interpret_batch(self, texts, today):
+        prompt = MODEL_PROMPT.format(
+            weekday=today.strftime("%A"),
+            today=today.isoformat(),
+            messages="\n".join(f"{i + 1}. {json.dumps(text, ensure_ascii=False)}" for i, text in enumerate(texts))
+        )
+        response = self.get_client().models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config={"response_mime_type": "application/json", "temperature": 0}
+        )
+        items = json.loads(response.text)
+        if not isinstance(items, list):
+            items = []
+        results = [Interpretation.from_dict(item) if isinstance(item, dict) else None for item in items[:len(texts)]]
+        return results + [None] * (len(texts) - len(results))
+
+class _Pending:
+    __slots__ = ('text', 'key', 'today', 'done', 'result', 'failed')
+
+    def __init__(self, text, today):
+        self.text = text
+        self.key = normalize(text)
+        self.today = today
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+class MicroBatcher:
+    """Sends model requests arriving within `window` seconds of each other as one call"""
+
+    def __init__(self, backend, window=0.02, max_batch=16, timeout=10):
+        self.backend = backend
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.queue = queue.Queue()
+        self.thread = None
+        self.calls = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="nlu-batcher", daemon=True)
+        self.thread.start()
+        return self
+
+    def interpret(self, text, today):
+        """Queue one message as the sender wrote it and wait for the model's Interpretation, or None
+
+        Raises ModelUnavailable if the call failed or took longer than `timeout`.
+        """
+        pending = _Pending(text, today)
+        self.queue.put(pending)
+        if not pending.done.wait(self.timeout) or pending.failed:
+            raise ModelUnavailable(text)
+        return pending.result
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._call(batch)
+
+    def _call(self, batch):
+        # Messages that normalize the same in one batch are only sent once, in the first sender's words
+        groups = OrderedDict()
+        for pending in batch:
+            groups.setdefault((pending.today, pending.key), []).append(pending)
+        by_day = OrderedDict()
+        for (today, key), pendings in groups.items():
+            by_day.setdefault(today, []).append((key, pendings[0].text))
+
+        for today, messages in by_day.items():
+            texts = [text for _, text in messages]
+            self.calls += 1
+            metrics.NLU_MODEL_CALLS.inc()
+            try:
+                results = self.backend.interpret_batch(texts, today)
+                failed = False
+            except Exception as e:
+                print(f"Error calling language model: {e}")
+                results, failed = [None] * len(texts), True
+            for (key, _), result in zip(messages, results):
+                for pending in groups[(today, key)]:
+                    pending.result = result
+                    pending.failed = failed
+                    pending.done.set()
+
+class ReminderUnderstanding:
+    """Turns a free-text message into a (message, datetime) reminder
+
+    The local parser is tried first. Messages it cannot handle go to the
+    model backend through the micro-batcher, and the model's answers are
+    kept in an LRU cache keyed by day and normalized text so that repeated
+    phrasings, including ones the model could not use, never cost another
+    call. With no backend only the local parser is used.
+    """
+
+    def __init__(self, backend=None, cache_size=10000, window=0.02, max_batch=16):
+        self.batcher = MicroBatcher(backend, window, max_batch).start() if backend else None
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"local": 0, "cache_hits": 0, "cache_misses": 0}
+
+    def _count(self, source, **stats):
+        metrics.NLU_PARSES.labels(source).inc()
+        with self.lock:
+            for key, amount in stats.items():
+                self.stats[key] += amount
+
+    @property
+    def cache_hit_ratio(self):
+        lookups = self.stats["cache_hits"] + self.stats["cache_misses"]
+        return self.stats["cache_hits"] / lookups if lookups else 0.0
+
+    @property
+    def model_calls(self):
+        return self.batcher.calls if self.batcher else 0
+
+    @property
+    def model_calls_saved(self):
+        """Calls avoided compared with sending every understood message to the model on its own"""
+        stats = self.stats
+        return stats["local"] + stats["cache_hits"] + stats["cache_misses"] - self.model_calls
+
+    def understand(self, text, now=None):
+        now = now or datetime.now()
+        interpretation = parse_local(text, now)
+        if interpretation is not None:
+            self._count("local", local=1)
+            return interpretation.resolve(now)
+
+        key = (now.date(), normalize(text))
+        if self.batcher is None or not REMINDER_HINT.search(key[1]):
+            self._count("unparsed")
+            return None
+
+        with self.lock:
+            cached = key in self.cache
+            if cached:
+                interpretation = self.cache[key]
+                self.cache.move_to_end(key)
+        if cached:
+            self._count("cache", cache_hits=1)
+        else:
+            try:
+                # The model gets the sender's own words so the reminder keeps their capitalisation
+                interpretation = self.batcher.interpret(text, key[0])
+            except ModelUnavailable:
+                # Not cached, so the next message like this tries the model again
+                self._count("failed")
+                return None
+            self._count("model", cache_misses=1)
+            with self.lock:
+                self.cache[key] = interpretation
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return interpretation.resolve(now) if interpretation else None
+
+def create_understander(backend, cache_size=10000, window=0.02, max_batch=16, **options):
+    """Build the free-text path for NLU_BACKEND: 'off', 'local', 'stub' or 'gemini'"""
+    if backend == "off":
+        return None
+    if backend == "gemini":
+        model = GeminiBackend(options.get("api_key"), options.get("model") or "gemini-2.5-flash")
+    elif backend == "stub":
+        stub_file = options.get("stub_file")
+        model = StubBackend.from_file(stub_file) if stub_file else StubBackend()
+    else:
+        model = None
+    return ReminderUnderstanding(model, cache_size, window, max_batch)
@@ -0,0 +1,128 @@
+import re
+from datetime import datetime, timedelta
+
+ONE_DAY = timedelta(days=1)
+
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+# Full names, plurals and the usual abbreviations only, so "month" or "sunset" is not a weekday; Monday is bit 0
+WEEKDAY_WORDS = {
+    word: day
+    for day, name in enumerate(WEEKDAY_NAMES)
+    for word in (name.lower(), name.lower() + 's', name[:3].lower())
+}
+WEEKDAY_WORDS.update(tues=1, thurs=3)
+WEEKDAYS = 0b0011111
+WEEKEND = 0b1100000
+
+EVERY_DAYS_PATTERN = re.compile(r'(\d{1,3})\s+days?')
+WEEKDAY_LIST_SEPARATOR = re.compile(r'\s*(?:,|\band\b|&|\s)\s*')
+WEEKDAY_RANGE = re.compile(r'\s*-\s*')
+
+class RecurrenceRule:
+    """A repeating reminder as one compact rule instead of one job per occurrence
+
+    Fires at hour:minute either on the days in the `weekdays` bit mask
+    (Monday is bit 0) or, with no mask, every `interval` days. Only the next
+    occurrence is ever computed, when the previous one fires.
+    """
+    __slots__ = ('interval', 'weekdays', 'hour', 'minute', 'until')
+
+    def __init__(self, interval=1, weekdays=0, hour=0, minute=0, until=None):
+        self.interval = interval
+        self.weekdays = weekdays
+        self.hour = hour
+        self.minute = minute
+        self.until = until
+
+    def first_after(self, now):
+        """The first occurrence strictly after `now`, or None if the rule has already ended"""
+        candidate = now.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if candidate <= now:
+            candidate += ONE_DAY
+        if self.weekdays:
+            while not self.weekdays >> candidate.weekday() & 1:
+                candidate += ONE_DAY
+        return self._within(candidate)
+
+    def next_occurrence(self, previous, now):
+        """The occurrence after `previous`, skipping any that were missed before `now`"""
+        if self.weekdays:
+            return self.first_after(max(previous, now))
+        step = self.interval * ONE_DAY
+        candidate = previous.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0) + step
+        if candidate <= now:
+            candidate += ((now - candidate) // step + 1) * step
+        return self._within(candidate)
+
+    def _within(self, candidate):
+        if self.until is not None and candidate > self.until:
+            return None
+        return candidate
+
+    def encode(self):
+        """Serialize to the text stored in reminders.recurrence, e.g. '1;0;08:30;'"""
+        until = self.until.isoformat(" ", "seconds") if self.until else ""
+        return f"{self.interval};{self.weekdays};{self.hour:02d}:{self.minute:02d};{until}"
+
+    @classmethod
+    def decode(cls, text):
+        interval, weekdays, at, until = text.split(";")
+        hour, minute = at.split(":")
+        return cls(
+            int(interval),
+            int(weekdays),
+            int(hour),
+            int(minute),
+            datetime.fromisoformat(until) if until else None
+        )
+
+    def describe(self):
+        at = f"{self.hour:02d}:{self.minute:02d}"
+        if self.weekdays == WEEKDAYS:
+            days = "every weekday"
+        elif self.weekdays == WEEKEND:
+            days = "every weekend day"
+        elif self.weekdays:
+            names = [WEEKDAY_NAMES[day] for day in range(7) if self.weekdays >> day & 1]
+            days = "every " + (", ".join(names[:-1]) + " and " + names[-1] if len(names) > 1 else names[0])
+        elif self.interval == 1:
+            days = "every day"
+        else:
+            days = f"every {self.interval} days"
+        description = f"{days} at {at}"
+        if self.until is not None:
+            description += f" until {self.until.strftime('%d %b %Y')}"
+        return description
+
+def parse_every(spec):
+    """Parse the part after 'every' into (interval, weekdays), or None
+
+    Understands "day", "week", "3 days", "weekday", "weekend", "monday",
+    lists like "mon, wed and fri" and ranges like "mon-fri".
+    """
+    spec = spec.strip().lower()
+    if spec == "day":
+        return 1, 0
+    if spec == "week":
+        return 7, 0
+    match = EVERY_DAYS_PATTERN.fullmatch(spec)
+    if match:
+        interval = int(match.group(1))
+        return (interval, 0) if interval > 0 else None
+    if spec in ("weekday", "weekdays"):
+        return 1, WEEKDAYS
+    if spec in ("weekend", "weekends"):
+        return 1, WEEKEND
+
+    weekdays = 0
+    for name in WEEKDAY_LIST_SEPARATOR.split(WEEKDAY_RANGE.sub('-', spec)):
+        if not name:
+            continue
+        first, dash, last = name.partition('-')
+        first, last = WEEKDAY_WORDS.get(first), WEEKDAY_WORDS.get(last if dash else first)
+        if first is None or last is None:
+            return None
+        # A range may wrap round the weekend, e.g. "fri-mon"
+        for offset in range((last - first) % 7 + 1):
+            weekdays |= 1 << (first + offset) % 7
+    return (1, weekdays) if weekdays else None
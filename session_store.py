@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+
+import database
+
+class Session:
+    """Conversation state for one sender while a reminder is being set up"""
+    __slots__ = ('state', 'date', 'time', 'cursor', 'touched')
+
+    def __init__(self, state, date=None, time=None, cursor=None, touched=0.0):
+        self.state = state
+        self.date = date
+        self.time = time
+        # Position of the last reminder shown by "list reminders", for "more"
+        self.cursor = cursor
+        self.touched = touched
+
+class MemorySessionStore:
+    """In-process session store with TTL and LRU eviction
+
+    Only senders part-way through a conversation or paging through their
+    reminders are stored; everybody else is implicitly in the initial state.
+    """
+
+    def __init__(self, ttl=3600, max_entries=100000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def get(self, sender):
+        now = time.monotonic()
+        with self.lock:
+            session = self.sessions.get(sender)
+            if session is None:
+                return None
+            if now - session.touched > self.ttl:
+                del self.sessions[sender]
+                return None
+            self.sessions.move_to_end(sender)
+            return session
+
+    def put(self, sender, session):
+        session.touched = now = time.monotonic()
+        with self.lock:
+            self.sessions[sender] = session
+            self.sessions.move_to_end(sender)
+            # Least recently used sessions sit at the front, so expired ones go first
+            while self.sessions:
+                oldest = next(iter(self.sessions.values()))
+                if len(self.sessions) <= self.max_entries and now - oldest.touched <= self.ttl:
+                    break
+                self.sessions.popitem(last=False)
+
+    def delete(self, sender):
+        with self.lock:
+            self.sessions.pop(sender, None)
+
+class SQLiteSessionStore:
+    """Session store in the shared reminder database, visible to every worker process"""
+
+    # Expired and over-limit sessions are purged once every this many writes
+    PURGE_EVERY = 1000
+
+    def __init__(self, ttl=3600, max_entries=100000, path=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.writes = 0
+        conn = database.get_connection(path)
+        with conn:
+            # Taken before the column check, so workers starting together don't both add it
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                whatsapp_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                date TEXT,
+                time TEXT,
+                cursor TEXT,
+                touched REAL NOT NULL
+            ) WITHOUT ROWID;
+            ''')
+            database.add_column_if_missing(conn.cursor(), 'sessions', 'cursor', 'TEXT')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_touched ON sessions (touched)")
+
+    def __len__(self):
+        return database.get_connection(self.path).execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def get(self, sender):
+        row = database.get_connection(self.path).execute(
+            "SELECT state, date, time, cursor, touched FROM sessions WHERE whatsapp_id = ? AND touched > ?",
+            (sender, time.time() - self.ttl)
+        ).fetchone()
+        return Session(*row) if row else None
+
+    def put(self, sender, session):
+        session.touched = time.time()
+        conn = database.get_connection(self.path)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (whatsapp_id, state, date, time, cursor, touched) VALUES (?, ?, ?, ?, ?, ?)",
+                (sender, session.state, session.date, session.time, session.cursor, session.touched)
+            )
+        self.writes += 1
+        if self.writes % self.PURGE_EVERY == 0:
+            self.purge()
+
+    def delete(self, sender):
+        conn = database.get_connection(self.path)
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE whatsapp_id = ?", (sender,))
+
+    def purge(self):
+        conn = database.get_connection(self.path)
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE touched <= ?", (time.time() - self.ttl,))
+            conn.execute('''
+                DELETE FROM sessions WHERE whatsapp_id IN (
+                    SELECT whatsapp_id FROM sessions ORDER BY touched DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+
+def create_session_store(backend, ttl=3600, max_entries=100000):
+    if backend == "sqlite":
+        return SQLiteSessionStore(ttl, max_entries)
+    return MemorySessionStore(ttl, max_entries)
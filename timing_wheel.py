@@ -0,0 +1,131 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+MINUTES_PER_HOUR = 60
+MINUTES_PER_DAY = 24 * 60
+DAY_SLOTS = 366
+
+# Reminder times are naive wall-clock datetimes, so minutes are counted from a naive epoch
+EPOCH = datetime(1970, 1, 1)
+ONE_MINUTE = timedelta(minutes=1)
+
+def minute_of(dt):
+    return (dt - EPOCH) // ONE_MINUTE
+
+def datetime_of(minute):
+    return EPOCH + minute * ONE_MINUTE
+
+class Entry:
+    __slots__ = ('due', 'to', 'msg', 'rule', 'cancelled')
+
+    def __init__(self, due, to, msg, rule=None):
+        self.due = due
+        self.to = to
+        self.msg = msg
+        # Recurring reminders keep their RecurrenceRule and are rescheduled when they fire
+        self.rule = rule
+        self.cancelled = False
+
+class TimingWheel:
+    """Hierarchical minute/hour/day timing wheel for minute-resolution reminders
+
+    Scheduling and cancelling are O(1). Entries further out than the day wheel
+    wait in an overflow list that is re-checked once a day.
+    """
+
+    def __init__(self, now=None):
+        self.now = minute_of(now or datetime.now())
+        self.minutes = [[] for _ in range(MINUTES_PER_HOUR)]
+        self.hours = [[] for _ in range(24)]
+        self.days = [[] for _ in range(DAY_SLOTS)]
+        self.overflow = []
+        self.ready = []
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.pending
+
+    def _place(self, entry):
+        due, now = entry.due, self.now
+        if due <= now:
+            self.ready.append(entry)
+        elif due // MINUTES_PER_HOUR == now // MINUTES_PER_HOUR:
+            self.minutes[due % MINUTES_PER_HOUR].append(entry)
+        elif due // MINUTES_PER_HOUR - now // MINUTES_PER_HOUR < 24:
+            self.hours[(due // MINUTES_PER_HOUR) % 24].append(entry)
+        elif due // MINUTES_PER_DAY - now // MINUTES_PER_DAY < DAY_SLOTS:
+            self.days[(due // MINUTES_PER_DAY) % DAY_SLOTS].append(entry)
+        else:
+            self.overflow.append(entry)
+
+    def schedule(self, run_date, to, msg, rule=None):
+        entry = Entry(minute_of(run_date), to, msg, rule)
+        with self.lock:
+            self._place(entry)
+            self.pending += 1
+        return entry
+
+    def cancel(self, entry):
+        # Cancelled entries are skipped lazily when their bucket is reached
+        with self.lock:
+            if not entry.cancelled:
+                entry.cancelled = True
+                self.pending -= 1
+
+    def _cascade(self, bucket):
+        for entry in bucket:
+            if not entry.cancelled:
+                self._place(entry)
+
+    def advance(self, now=None):
+        """Move the wheel up to `now` and return every entry that has come due"""
+        target = minute_of(now or datetime.now())
+        with self.lock:
+            due = self.ready
+            self.ready = []
+            while self.now < target:
+                self.now += 1
+                minute = self.now
+                if minute % MINUTES_PER_DAY == 0:
+                    overflow, self.overflow = self.overflow, []
+                    self._cascade(overflow)
+                    slot = (minute // MINUTES_PER_DAY) % DAY_SLOTS
+                    bucket, self.days[slot] = self.days[slot], []
+                    self._cascade(bucket)
+                if minute % MINUTES_PER_HOUR == 0:
+                    slot = (minute // MINUTES_PER_HOUR) % 24
+                    bucket, self.hours[slot] = self.hours[slot], []
+                    self._cascade(bucket)
+                slot = minute % MINUTES_PER_HOUR
+                due.extend(self.minutes[slot])
+                self.minutes[slot] = []
+                # Cascading may have moved entries that were already due into ready
+                due.extend(self.ready)
+                self.ready = []
+            due = [entry for entry in due if not entry.cancelled]
+            self.pending -= len(due)
+        return due
+
+def run_wheel(wheel, send_batch, interval=5):
+    while True:
+        try:
+            bucket = wheel.advance()
+            if bucket:
+                send_batch(bucket)
+        except Exception as e:
+            print(f"Error firing reminders: {e}")
+        # Wake up right on the next minute boundary so buckets fire without drift
+        now = datetime.now()
+        time.sleep(min(interval, 60 - now.second - now.microsecond / 1e6))
+
+def start_wheel(wheel, send_batch, interval=5):
+    thread = threading.Thread(
+        target=run_wheel,
+        args=(wheel, send_batch, interval),
+        name="reminder-wheel",
+        daemon=True
+    )
+    thread.start()
+    return thread
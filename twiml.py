@@ -0,0 +1,12 @@
+from xml.sax.saxutils import escape
+
+XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8"?>'
+
+def render_message(text):
+    """Serialize a TwiML response carrying a single message, escaped the same way as MessagingResponse"""
+    return b''.join((
+        XML_DECLARATION,
+        b'<Response><Message>',
+        escape(text).encode('utf-8'),
+        b'</Message></Response>'
+    ))
@@ -0,0 +1,117 @@
+import atexit
+import queue
+import threading
+import time
+
+import database
+
+class GroupCommitWriter:
+    """Applies reminder inserts from a background thread, many per transaction
+
+    Webhooks queue a write and reply straight away instead of waiting for
+    their own commit. A single writer thread takes everything queued within
+    `interval` seconds (up to `max_batch` writes) and commits it as one
+    transaction, so writes reach the database in the order they were queued
+    and each batch lands entirely or not at all. Anything still queued when
+    the process exits is written first; a crash can only lose the writes
+    queued since the last commit.
+    """
+
+    def __init__(self, interval=0.05, max_batch=1000, queue_size=100000, path=None):
+        self.interval = interval
+        self.max_batch = max_batch
+        self.path = path
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.submit_lock = threading.Lock()
+        self.committed_changed = threading.Condition()
+        self.submitted = 0
+        self.committed = 0
+        self.thread = None
+        self.running = False
+        self.stats = {"writes": 0, "commits": 0, "errors": 0}
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+        return self
+
+    def submit(self, write, *args):
+        """Queue `write(*args, conn=conn)` for a later transaction, blocking while the queue is full"""
+        with self.submit_lock:
+            self.submitted += 1
+            self.queue.put((self.submitted, write, args))
+
+    def is_alive(self):
+        return self.running
+
+    def flush(self, timeout=None):
+        """Wait until every write queued so far is committed, returning False on timeout or if the writer has died"""
+        target = self.submitted
+        with self.committed_changed:
+            self.committed_changed.wait_for(lambda: self.committed >= target or not self.is_alive(), timeout)
+            return self.committed >= target
+
+    def close(self, timeout=30):
+        """Commit whatever is still queued and stop the writer thread"""
+        if self.thread is None or not self.thread.is_alive():
+            return
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+    def _run(self):
+        try:
+            self._drain()
+        except Exception as e:
+            print(f"Group commit writer stopped: {e}")
+        finally:
+            # Wake anyone waiting in flush() so they see the writer is gone
+            with self.committed_changed:
+                self.running = False
+                self.committed_changed.notify_all()
+
+    def _drain(self):
+        conn = database.connect(self.path)
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(conn, batch)
+        conn.close()
+
+    def _commit(self, conn, batch):
+        try:
+            with conn:
+                for _, write, args in batch:
+                    write(*args, conn=conn)
+            commits = 1
+        except Exception:
+            # Don't let one bad write take the rest of its batch down; retry them one transaction each, in order
+            commits = 0
+            for _, write, args in batch:
+                try:
+                    with conn:
+                        write(*args, conn=conn)
+                    commits += 1
+                except Exception as e:
+                    print(f"Error writing {write.__name__}: {e}")
+                    self.stats["errors"] += 1
+
+        self.stats["writes"] += len(batch)
+        self.stats["commits"] += commits
+        with self.committed_changed:
+            self.committed = batch[-1][0]
+            self.committed_changed.notify_all()